@@ -1,20 +1,85 @@
 import click
+import fnmatch
+import os
+import re
+import stat
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from functools import partial
 from pathlib import Path
-from czi2tif.read import process_file
+from typing import Iterator, Optional, Tuple
+from czi2tif.formats import SUPPORTED_EXTENSIONS
 from czi2tif.logging import setup_logging, configure_module_logger
-from czi2tif.export import ExportParams
 
 general_config = {
-    "bit_depth": 16,
+    "bit_depth": None,
     "verbose": False,
     "quiet": False,
     "log_file": None,
     "output": None,
+    "jobs": 1,
+    "compression": "none",
 }
 
 # Set up module logger
 logger = configure_module_logger(__name__)
 
+# The supported extensions in the tuple form that str.endswith takes
+_SUPPORTED_SUFFIXES = tuple(sorted(SUPPORTED_EXTENSIONS))
+
+
+def iter_input_files(
+    root: Path,
+    recursive: bool,
+    extensions: Tuple[str, ...],
+    match: Optional[str] = None,
+) -> Iterator[Path]:
+    """Yield the supported files below root in a single directory walk.
+
+    Suffixes are compared case-insensitively and the optional match pattern
+    is applied on the fly, so no intermediate file lists are built. The
+    pattern may contain shell-style wildcards and matches anywhere in the name.
+    Directories that cannot be listed are skipped with a warning.
+    """
+    # Compile the pattern once into a regex instead of matching per file
+    is_match = re.compile(fnmatch.translate(f"*{match}*")).match if match else None
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            # Files are converted while the walk goes on, so an unreadable
+            # directory must not abort a batch that is already under way
+            logger.warning("Skipping unreadable directory %s: %s", directory, e)
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    if is_match is None or is_match(entry.name):
+                        yield Path(entry.path)
+
+
+def _log_result(future: Future, name: str, verbose: bool) -> None:
+    """Log the outcome of a file conversion that ran in a worker process."""
+    try:
+        future.result()
+        logger.info("Converted: %s", name)
+    except Exception as e:
+        logger.error("Failed to process %s: %s", name, e)
+        if verbose:
+            logger.exception("Full traceback:")
+
 
 @click.command()
 @click.argument("input", type=click.Path(exists=True, file_okay=True, dir_okay=True))
@@ -35,7 +100,7 @@ logger = configure_module_logger(__name__)
     "--match",
     "-m",
     type=str,
-    help="Only convert files whose name contains this substring",
+    help="Only convert files whose name contains this pattern (wildcards allowed)",
     default=None,
 )
 @click.option(
@@ -59,14 +124,47 @@ logger = configure_module_logger(__name__)
     "--bit-depth",
     "-bd",
     type=click.Choice(["8", "16", "32"]),
-    help=f"Bit depth for the output TIF files (default: {general_config['bit_depth']})",
-    default=str(general_config["bit_depth"]),
+    help="Bit depth for the output TIF files (default: keep the source bit depth)",
+    default=general_config["bit_depth"],
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    help="Number of files to convert in parallel, 0 uses all CPU cores "
+    f"(default: {general_config['jobs']})",
+    default=general_config["jobs"],
+)
+@click.option(
+    "--compression",
+    "-c",
+    type=click.Choice(["none", "zlib"]),
+    help="Compression for the output TIF files, zlib is lossless deflate "
+    f"(default: {general_config['compression']})",
+    default=general_config["compression"],
+)
+@click.option(
+    "--skip-existing",
+    "-s",
+    is_flag=True,
+    help="Skip files whose TIF output is newer than the source, e.g. to resume "
+    "an interrupted batch with the same options",
 )
-def main(input, output, recursive, match, verbose, quiet, log_file, bit_depth):
+def main(
+    input,
+    output,
+    recursive,
+    match,
+    verbose,
+    quiet,
+    log_file,
+    bit_depth,
+    jobs,
+    compression,
+    skip_existing,
+):
     """Convert CZI files to TIF format with scaling information."""
 
-    allowed_extensions = (".czi", ".lif")
-
     # Validate mutually exclusive options
     if verbose and quiet:
         click.echo(
@@ -76,74 +174,138 @@ def main(input, output, recursive, match, verbose, quiet, log_file, bit_depth):
 
     # Initialize logging
     if quiet:
-        setup_logging(quiet=True)
+        logging_config = {"quiet": True}
     else:
         log_level = "DEBUG" if verbose else "INFO"
         file_output = log_file is not None
-        setup_logging(
-            log_level=log_level,
-            log_file=Path(log_file) if log_file else None,
-            console_output=True,
-            file_output=file_output,
-            quiet=False,
-        )
+        logging_config = {
+            "log_level": log_level,
+            "log_file": Path(log_file) if log_file else None,
+            "console_output": True,
+            "file_output": file_output,
+            "quiet": False,
+        }
+    setup_logging(**logging_config)
 
     logger.info("Starting czi2tif conversion")
     logger.debug(
-        f"Input: {input}, Output: {output}, Recursive: {recursive}, Match: {match}"
+        "Input: %s, Output: %s, Recursive: %s, Match: %s",
+        input,
+        output,
+        recursive,
+        match,
     )
 
-    is_input_dir = Path(input).is_dir()
-    is_input_file = Path(input).is_file()
+    # A single stat() call answers both the directory and the file check
+    input_path = Path(input)
+    input_mode = input_path.stat().st_mode
+    is_input_dir = stat.S_ISDIR(input_mode)
+    is_input_file = stat.S_ISREG(input_mode)
 
     if is_input_dir:
         if output is None:
-            output = Path(input) / "tif"
-        logger.info(f"Processing directory: {input}")
+            output = input_path / "tif"
+        logger.info("Processing directory: %s", input)
     elif is_input_file:
-        if not is_input_file or Path(input).suffix.lower() not in allowed_extensions:
-            logger.error(f"Input file must be a CZI or LIF file: {input}")
+        if input_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            logger.error("Input file must be a CZI or LIF file: %s", input)
             raise ValueError(f"Input file must be a CZI or LIF file: {input}")
         if output is None:
-            output = Path(input).parent / "tif"
-        logger.info(f"Processing file: {input}")
+            output = input_path.parent / "tif"
+        logger.info("Processing file: %s", input)
 
-    # if not output.exists():
-    #     output.mkdir(parents=True, exist_ok=True)
+    # Created up front so that it exists even if no file is converted;
+    # process_file also makes sure it exists, but only once per process
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    logger.info("Output directory: %s", output)
 
-    logger.info(f"Output directory: {output}")
+    # The readers pull in numpy, tifffile, aicspylibczi and readlif, so they
+    # are only imported once there is something to convert (keeps --help fast)
+    from czi2tif.export import ExportParams
+    from czi2tif.read import process_file
 
-    export_params = ExportParams(output_dir=Path(output), bit_depth=int(bit_depth))
+    export_params = ExportParams(
+        output_dir=output,
+        bit_depth=None if bit_depth is None else int(bit_depth),
+        compression=None if compression == "none" else compression,
+        skip_existing=skip_existing,
+    )
 
     if is_input_dir:
-        files = []
-        for ext in allowed_extensions:
-            files.extend(Path(input).glob(f"**/*{ext}" if recursive else f"*{ext}"))
-        logger.info(f"Found {len(files)} files to process")
-
-        # TODO: extend this it matches proper regexes
-        if match:
-            files = [f for f in files if match in f.name]
-            logger.info(f"Filtered files: {files}")
-
-        for i, file in enumerate(files, 1):
-            logger.info(f"Converting {i}/{len(files)}: {file.name}")
-            logger.debug(f"Processing file: {file} -> {output}")
-            try:
-                process_file(file, export_params)
-                logger.debug(f"Successfully processed: {file.name}")
-            except Exception as e:
-                logger.error(f"Failed to process {file.name}: {e}")
-                if verbose:
-                    logger.exception("Full traceback:")
+        # Files are converted as the directory walk yields them, so the first
+        # conversion starts without waiting for the whole tree to be listed
+        files = iter_input_files(
+            input_path, recursive, _SUPPORTED_SUFFIXES, match or None
+        )
+
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+
+        n_files = 0
+        if jobs > 1:
+            logger.info("Converting with up to %s parallel workers", jobs)
+            # Each worker reads with read_workers threads: the plane reader
+            # pool (whose libCZI reads are single-threaded) or, for whole
+            # scenes, libCZI's own threads. Sharing the cores out keeps the
+            # workers from oversubscribing them
+            export_params = replace(
+                export_params, read_workers=max(1, (os.cpu_count() or 1) // jobs)
+            )
+            # Workers started with "spawn" (macOS/Windows) do not inherit the
+            # logging handlers, so each one configures logging on startup
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=partial(setup_logging, **logging_config),
+            ) as executor:
+                # Keep at most two queued files per worker
+                pending = {}
+                for file in files:
+                    n_files += 1
+                    logger.debug("Queueing file %s: %s -> %s", n_files, file, output)
+                    try:
+                        future = executor.submit(process_file, file, export_params)
+                    except BrokenProcessPool:
+                        # A worker died (e.g. killed when out of memory) and the
+                        # pool takes no more files; queued files fail on their
+                        # own below, the rest of the walk is reported here
+                        not_converted = [file.name, *(f.name for f in files)]
+                        n_files += len(not_converted) - 1
+                        logger.error(
+                            "Worker pool stopped, %s files not converted: %s",
+                            len(not_converted),
+                            ", ".join(not_converted),
+                        )
+                        break
+                    pending[future] = file.name
+                    if len(pending) >= 2 * jobs:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            _log_result(future, pending.pop(future), verbose)
+                for future in as_completed(pending):
+                    _log_result(future, pending[future], verbose)
+        else:
+            for n_files, file in enumerate(files, 1):
+                name = file.name
+                logger.info("Converting file %s: %s", n_files, name)
+                logger.debug("Processing file: %s -> %s", file, output)
+                try:
+                    process_file(file, export_params)
+                    logger.debug("Successfully processed: %s", name)
+                except Exception as e:
+                    logger.error("Failed to process %s: %s", name, e)
+                    if verbose:
+                        logger.exception("Full traceback:")
+
+        logger.info("Processed %s files", n_files)
 
     elif is_input_file:
-        logger.info(f"Converting single file: {Path(input).name}")
+        logger.info("Converting single file: %s", input_path.name)
         try:
-            process_file(input, export_params)
+            process_file(input_path, export_params)
             logger.info("Conversion completed successfully")
         except Exception as e:
-            logger.error(f"Failed to process {Path(input).name}: {e}")
+            logger.error("Failed to process %s: %s", input_path.name, e)
             if verbose:
                 logger.exception("Full traceback:")
 
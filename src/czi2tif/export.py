@@ -1,7 +1,101 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional, Tuple
 
-@dataclass
+import numpy as np
+
+# Output dtype for each supported --bit-depth; 32-bit is float as in ImageJ
+BIT_DEPTH_DTYPES = {8: np.uint8, 16: np.uint16, 32: np.float32}
+
+@dataclass(frozen=True, slots=True)
 class ExportParams:
     output_dir: Path
-    bit_depth: int
\ No newline at end of file
+    bit_depth: Optional[int] = None  # None keeps the source dtype
+    compression: Optional[str] = None
+    skip_existing: bool = False  # keep outputs newer than their source
+    read_workers: Optional[int] = None  # reader threads per file; None = default
+
+
+def needs_data_range(dtype: np.dtype, bit_depth: Optional[int]) -> bool:
+    """
+    Check whether converting to the requested bit depth stretches the data.
+
+    Without stretching, the conversion works pixel by pixel, so image data can
+    be converted in parts (e.g. plane by plane) with the same result.
+
+    Args:
+        dtype: Data type of the image data
+        bit_depth: Requested bit depth (8, 16 or 32), or None to keep dtype
+
+    Returns:
+        True if the conversion depends on the data range of the whole image
+    """
+    if bit_depth is None:
+        return False
+    target = np.dtype(BIT_DEPTH_DTYPES[bit_depth])
+    if dtype == target or target.kind == "f":
+        return False
+    return not (dtype.kind in "ui" and np.can_cast(dtype, target, casting="safe"))
+
+
+def get_data_range(img: np.ndarray) -> Tuple[float, float]:
+    """
+    Get the minimum and maximum value of image data.
+
+    Args:
+        img: Image data
+
+    Returns:
+        Tuple of the minimum and maximum value
+    """
+    # Both reductions run plane by plane, so each 2D plane is read twice while
+    # it is still in cache instead of streaming the whole image twice
+    lo, hi = np.inf, -np.inf
+    for index in np.ndindex(img.shape[:-2]):
+        plane = img[index]
+        lo = min(lo, float(plane.min()))
+        hi = max(hi, float(plane.max()))
+    return lo, hi
+
+
+def convert_bit_depth(
+    img: np.ndarray,
+    bit_depth: Optional[int],
+    data_range: Optional[Tuple[float, float]] = None,
+) -> np.ndarray:
+    """
+    Convert image data to the dtype of the requested bit depth.
+
+    Data that already has the target dtype, or when no bit depth is requested,
+    is returned unchanged. Conversions to a wider type (and to 32-bit float)
+    keep the pixel values, while conversions to a narrower integer type
+    stretch the data range linearly onto the full range of the target type.
+
+    Args:
+        img: Image data
+        bit_depth: Requested bit depth (8, 16 or 32), or None to keep dtype
+        data_range: Range to stretch, if img is only part of the image.
+            Defaults to the range of img
+
+    Returns:
+        Image data with the dtype of the requested bit depth
+    """
+    if bit_depth is None:
+        return img
+    dtype = np.dtype(BIT_DEPTH_DTYPES[bit_depth])
+    if img.dtype == dtype:
+        return img
+    if not needs_data_range(img.dtype, bit_depth):
+        return img.astype(dtype)
+
+    lo, hi = get_data_range(img) if data_range is None else data_range
+    scale = np.iinfo(dtype).max / (hi - lo) if hi > lo else 0.0
+    # (x - lo) * scale + 0.5 folded into one multiply and one add, where the
+    # add rounds and casts straight into the output; going plane by plane
+    # keeps the float32 temporary to a single plane
+    offset = 0.5 - lo * scale
+    out = np.empty(img.shape, dtype=dtype)
+    for index in np.ndindex(img.shape[:-2]):
+        scaled = np.multiply(img[index], scale, dtype=np.float32)
+        np.add(scaled, offset, out=out[index], casting="unsafe")
+    return out
\ No newline at end of file
@@ -0,0 +1,6 @@
+from typing import FrozenSet
+
+# Input formats, matched case-insensitively. Kept free of the readers' heavy
+# imports so that the CLI can filter its inputs without loading them; each
+# one needs a converter in read.FILE_HANDLERS
+SUPPORTED_EXTENSIONS: FrozenSet[str] = frozenset({".czi", ".lif"})
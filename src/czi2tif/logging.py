@@ -1,10 +1,44 @@
 """Centralized logging configuration for czi2tif application."""
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
+# Thread, process and multiprocessing names are never formatted, so skip
+# collecting them for every log record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# Source file of the logging module, which findCaller skips when it walks
+# the stack for the caller's function and line
+_SRCFILE = logging._srcfile
+
+# Listener writing the queued records to the log file, if file output is on
+_file_listener: Optional[QueueListener] = None
+
+
+def _reset_handlers(logger: logging.Logger) -> None:
+    """Flush and close the handlers of a previous setup_logging call."""
+    global _file_listener
+    if _file_listener is not None:
+        # Stopping the listener writes out all records still in the queue
+        _file_listener.stop()
+        for handler in _file_listener.handlers:
+            handler.close()
+        _file_listener = None
+    
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers.clear()
+
+
+atexit.register(lambda: _reset_handlers(logging.getLogger("czi2tif")))
+
 
 def setup_logging(
     log_level: str = "INFO",
@@ -29,8 +63,8 @@ def setup_logging(
     # Create logger
     logger = logging.getLogger("czi2tif")
     
-    # Clear any existing handlers to avoid duplicates
-    logger.handlers.clear()
+    # Close any existing handlers to avoid duplicates and leaked log files
+    _reset_handlers(logger)
     
     # If quiet mode, disable all logging
     if quiet:
@@ -45,11 +79,16 @@ def setup_logging(
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
     logger.setLevel(numeric_level)
     
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    # Create formatter; the caller's function and line are only worth the
+    # stack lookup per record when debugging, so above DEBUG findCaller is
+    # switched off (a None _srcfile makes logging skip it)
+    if numeric_level <= logging.DEBUG:
+        log_format = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+        logging._srcfile = _SRCFILE
+    else:
+        log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        logging._srcfile = None
+    formatter = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
     
     # Console handler
     if console_output:
@@ -70,14 +109,21 @@ def setup_logging(
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
         
-        logger.info(f"Logging to file: {log_file}")
+        # Hand records to a background thread so that writing the log file
+        # does not block the conversion
+        global _file_listener
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _file_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _file_listener.start()
+        logger.addHandler(QueueHandler(log_queue))
+        
+        logger.info("Logging to file: %s", log_file)
     
     # Prevent propagation to root logger
     logger.propagate = False
     
-    logger.info(f"Logging initialized with level: {log_level}")
+    logger.info("Logging initialized with level: %s", log_level)
     return logger
 
 
@@ -1,5 +1,23 @@
-from typing import Union, Tuple, List, Dict
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain
+from typing import (
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    TypeVar,
+    Union,
+    Tuple,
+    List,
+    Dict,
+    Optional,
+)
 from pathlib import Path
+import io
+import os
+import uuid
 import xml.etree.ElementTree as ET
 
 import numpy as np
@@ -7,7 +25,13 @@ from aicspylibczi import CziFile
 from tifffile import imwrite, RESUNIT
 
 from czi2tif.logging import configure_module_logger
-from czi2tif.export import ExportParams
+from czi2tif.export import (
+    BIT_DEPTH_DTYPES,
+    ExportParams,
+    convert_bit_depth,
+    get_data_range,
+    needs_data_range,
+)
 from readlif.reader import LifFile
 
 # Set up module logger
@@ -15,68 +39,105 @@ logger = configure_module_logger(__name__)
 
 Pathlike = Union[str, Path]
 CziShape = List[Dict[str, Tuple[int, ...]]]
+PlaneT = TypeVar("PlaneT")
+
+# Threads reading planes of one entry at a time. Reads on these threads run
+# libCZI single-threaded (cores=1), as it otherwise starts cpu_count() - 1
+# threads of its own for every read_image call
+READ_WORKERS = min(8, os.cpu_count() or 1)
+
+# Larger stacks and mosaics are never held in memory as a whole: if their
+# bit depth conversion needs the data range, their planes are read twice
+MAX_ASSEMBLED_BYTES = 4 * 2**30
 
 
 def read_czi(czi_file: Pathlike) -> CziFile:
     """Read a CZI file and return CziFile object."""
-    logger.debug(f"Reading CZI file: {czi_file}")
+    logger.debug("Reading CZI file: %s", czi_file)
     try:
         czi_obj = CziFile(czi_file)
-        logger.debug(f"Successfully loaded CZI file: {czi_file}")
+        logger.debug("Successfully loaded CZI file: %s", czi_file)
         return czi_obj
     except Exception as e:
-        logger.error(f"Failed to read CZI file {czi_file}: {e}")
+        logger.error("Failed to read CZI file %s: %s", czi_file, e)
         raise
 
 
-def get_resolution(metadata: ET.Element) -> Tuple[float, ...]:
-    """Get the resolution from the czi metadata."""
-    logger.debug("Extracting resolution from CZI metadata")
+def _value_text(distance: ET.Element) -> Optional[str]:
+    """Return the text of a Distance's Value child, if it has one."""
+    value_element = distance.find("Value")
+    return None if value_element is None else value_element.text
 
-    root = ET.ElementTree(metadata).getroot()
 
-    distance_element = root.find(".//Distance[@Id='X']/Value")  # type: ignore
-    if distance_element is None:
+def _parse_distance(text: Optional[str]) -> Optional[float]:
+    """Parse a Distance value, or None if it is missing or not a number."""
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _iter_distances(
+    metadata: Union[ET.Element, str, bytes],
+) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """Yield the (Id, Value) pairs of the Distance entries in CZI metadata.
+
+    Raw XML is streamed with iterparse, clearing finished elements, so the
+    caller can stop reading as soon as it has what it needs. The stream also
+    ends with the first Scaling block that held Distances, so 2D files (no Z)
+    do not parse the rest of the document.
+    """
+    if isinstance(metadata, ET.Element):
+        for distance in metadata.iter("Distance"):
+            yield distance.get("Id"), _value_text(distance)
+        return
+
+    source = (
+        io.BytesIO(metadata) if isinstance(metadata, bytes) else io.StringIO(metadata)
+    )
+    found_distances = False
+    for _, elem in ET.iterparse(source, events=("end",)):
+        if elem.tag == "Distance":
+            found_distances = True
+            yield elem.get("Id"), _value_text(elem)
+        elif elem.tag == "Scaling" and found_distances:
+            # Other Scaling elements (without Distances) may come earlier
+            return
+        if elem.tag != "Value":
+            # Values are read when their Distance ends, everything else is done
+            elem.clear()
+
+
+def get_resolution(metadata: Union[ET.Element, str, bytes]) -> Tuple[float, ...]:
+    """Get the resolution from the czi metadata, parsed or as raw XML."""
+    logger.debug("Extracting resolution from CZI metadata")
+
+    # Collect the X/Y/Z pixel sizes (in meters) in a single pass over the metadata
+    sizes: Dict[str, float] = {}
+    for axis, value in _iter_distances(metadata):
+        if axis in ("X", "Y", "Z") and axis not in sizes:
+            size = _parse_distance(value)
+            if size is not None:
+                logger.debug("Found %s resolution: %s", axis, size)
+                sizes[axis] = size
+                if len(sizes) == 3:
+                    # All axes found, skip the rest of the metadata
+                    break
+
+    if "X" not in sizes or "Y" not in sizes:
         logger.warning("No resolution found in metadata. Assuming 1 pixel per micron.")
         return (1, 1, 1)
-    else:
-        res_x = float(distance_element.text)  # type: ignore
-        logger.debug(f"Found X resolution: {res_x}")
-        # convert to pixels per micron
-        res_x = 1 / (res_x * 1e6)
-
-        distance_element = root.find(".//Distance[@Id='Y']/Value")  # type: ignore
-        res_y = float(distance_element.text)  # type: ignore
-        logger.debug(f"Found Y resolution: {res_y}")
-
-        # convert to pixels per micron
-        res_y = 1 / (res_y * 1e6)
-
-        distance_element = root.find(".//Distance[@Id='Z']/Value")  # type: ignore
-        if distance_element is not None and distance_element.text is not None:
-            try:
-                res_z = float(distance_element.text)
-                logger.debug(f"Found Z resolution: {res_z}")
-                # convert to pixels per micron
-                res_z = 1 / (res_z * 1e6)
-                final_resolution = (res_x, res_y, res_z)
-                logger.info(
-                    f"Extracted resolution (pixels/micron): X={res_x:.6f}, Y={res_y:.6f}, Z={res_z:.6f}"
-                )
-            except (AttributeError, TypeError, ValueError):
-                final_resolution = (res_x, res_y)
-                logger.debug("Error processing Z resolution, using 2D resolution")
-                logger.info(
-                    f"Extracted resolution (pixels/micron): X={res_x:.6f}, Y={res_y:.6f}"
-                )
-        else:
-            final_resolution = (res_x, res_y)
-            logger.debug("No Z resolution found, using 2D resolution")
-            logger.info(
-                f"Extracted resolution (pixels/micron): X={res_x:.6f}, Y={res_y:.6f}"
-            )
 
-        return final_resolution
+    # convert to pixels per micron; without a Z size the resolution is 2D
+    axes = [axis for axis in ("X", "Y", "Z") if axis in sizes]
+    resolution = tuple(1 / (sizes[axis] * 1e6) for axis in axes)
+    logger.info(
+        "Extracted resolution (pixels/micron): %s",
+        ", ".join(f"{axis}={res:.6f}" for axis, res in zip(axes, resolution)),
+    )
+    return resolution
 
 
 def has_scenes(czi_dims: str) -> bool:
@@ -94,62 +155,272 @@ def has_stacks(czi_dims: str) -> bool:
     return "Z" in czi_dims
 
 
-def get_scene_data(czi: CziFile, entry_index: int) -> Tuple[np.ndarray, list]:
-    """Get the image data from the CZI file."""
-    image_data, dims = czi.read_image(S=entry_index)
+def get_scene_data(
+    czi: CziFile, entry_index: int, cores: Optional[int] = None
+) -> Tuple[np.ndarray, list]:
+    """Get the image data from the CZI file.
+
+    cores limits the threads libCZI reads with (cpu_count() - 1 by default).
+    """
+    cores_kwargs = {} if cores is None else {"cores": cores}
+    image_data, dims = czi.read_image(S=entry_index, **cores_kwargs)
     return image_data, dims
 
 
+def _iter_planes(
+    read_plane: Callable[[Tuple[int, ...]], PlaneT],
+    grid: Tuple[int, ...],
+    max_workers: Optional[int] = None,
+) -> Iterator[PlaneT]:
+    """Yield read_plane for every index of grid, in order.
+
+    Planes are read ahead on max_workers reader threads (READ_WORKERS by
+    default), but no more than that many are held before the consumer takes
+    them.
+    """
+    max_workers = max_workers or READ_WORKERS
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: Deque[Future] = deque()
+        for index in np.ndindex(grid):
+            pending.append(pool.submit(read_plane, index))
+            if len(pending) > max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def assemble_planes(grid: Tuple[int, int], planes: Iterable[np.ndarray]) -> np.ndarray:
+    """Copy the planes of a (Z, C) grid into one preallocated array."""
+    # The first plane fixes the shape and dtype of the array, so the planes are
+    # never held twice (as a list of planes and as the final array)
+    img = None
+    for index, plane in zip(np.ndindex(grid), planes):
+        if img is None:
+            img = np.empty(grid + plane.shape, dtype=plane.dtype)
+        img[index] = plane
+    return img
+
+
+def _pinned_dims(entry_shape: Dict[str, Tuple[int, ...]]) -> Dict[str, int]:
+    """Get the constraints that pin a single time point in plane reads.
+
+    libCZI scans far more subblocks when T is left unspecified, so a single
+    time point is always passed explicitly.
+    """
+    if "T" in entry_shape and entry_shape["T"][-1] == 1:
+        return {"T": entry_shape["T"][0]}
+    return {}
+
+
+def _iter_stack_reads(
+    czi: CziFile, scene_index: int, max_workers: Optional[int] = None
+) -> Tuple[Tuple[int, int], Iterator[Tuple[np.ndarray, list]]]:
+    """Get the (Z, C) grid of a stack and its plane reads in that order.
+
+    All channels of a Z plane are read by one read_image call, then split into
+    single channel views; each one is paired with the dims of its plane read.
+    """
+    dims_shape = czi.get_dims_shape()[0]
+    grid = (dims_shape["Z"][-1], dims_shape["C"][-1])
+    pinned_dims = _pinned_dims(dims_shape)
+
+    def read_plane(index: Tuple[int, ...]) -> Tuple[np.ndarray, list]:
+        (plane_index,) = index
+        return czi.read_image(S=scene_index, Z=plane_index, cores=1, **pinned_dims)
+
+    def split_channels(
+        reads: Iterator[Tuple[np.ndarray, list]],
+    ) -> Iterator[Tuple[np.ndarray, list]]:
+        for image_data, dims in reads:
+            channel_axis = [dim[0] for dim in dims].index("C")
+            for channel_index in range(grid[1]):
+                channel = [slice(None)] * image_data.ndim
+                channel[channel_axis] = slice(channel_index, channel_index + 1)
+                yield image_data[tuple(channel)], dims
+
+    return grid, split_channels(_iter_planes(read_plane, grid[:1], max_workers))
+
+
+def iter_stack_planes(
+    czi: CziFile, scene_index: int, max_workers: Optional[int] = None
+) -> Tuple[Tuple[int, int], Iterator[np.ndarray]]:
+    """Get the (Z, C) grid of a stack and its planes in that order."""
+    grid, reads = _iter_stack_reads(czi, scene_index, max_workers)
+    return grid, (image_data for image_data, _ in reads)
+
+
 def get_stack_data(czi: CziFile, scene_index: int) -> Tuple[np.ndarray, list]:
     """Get the image data from the CZI file."""
-    n_planes = czi.get_dims_shape()[0]["Z"][-1]
-    n_channels = czi.get_dims_shape()[0]["C"][-1]
-    full_image_data = []
-    full_dims = []
-    for plane_index in range(n_planes):
-        channel_image_data = []
-        channel_dims = []
-        for channel_index in range(n_channels):
-            image_data, dims = czi.read_image(
-                S=scene_index, Z=plane_index, C=channel_index
-            )
-            channel_image_data.append(image_data)
-            channel_dims.append(dims)
-        full_image_data.append(channel_image_data)
-        full_dims.append(channel_dims)
-
-    return np.array(full_image_data), full_dims
+    grid, reads = _iter_stack_reads(czi, scene_index)
+    full_dims: list = [[None] * grid[1] for _ in range(grid[0])]
+
+    def image_data():
+        for (plane_index, channel_index), (data, dims) in zip(np.ndindex(grid), reads):
+            full_dims[plane_index][channel_index] = dims
+            yield data
+
+    return assemble_planes(grid, image_data()), full_dims
+
+
+def iter_mosaic_planes(
+    czi: CziFile,
+    entry_index: int,
+    czi_dims: str,
+    czi_shape: CziShape,
+    max_workers: Optional[int] = None,
+) -> Tuple[Tuple[int, int], Iterator[np.ndarray]]:
+    """Get the (Z, C) grid of a mosaic entry and its planes in that order."""
+    # Loop-invariant lookups, bound once instead of per channel and plane
+    entry_shape = czi_shape[entry_index]
+    is_stacks = has_stacks(czi_dims)
+    bbox = czi.get_all_mosaic_scene_bounding_boxes()[0]
+    region = (bbox.x, bbox.y, bbox.w, bbox.h)
+    grid = (entry_shape["Z"][-1] if is_stacks else 1, entry_shape["C"][-1])
+    pinned_dims = _pinned_dims(entry_shape)
+
+    def read_plane(index: Tuple[int, int]) -> np.ndarray:
+        plane, channel = index
+        plane_kwargs = {"Z": plane, **pinned_dims} if is_stacks else pinned_dims
+        return czi.read_mosaic(
+            region=region,
+            scale_factor=1,
+            C=channel,
+            **plane_kwargs,
+        ).squeeze()
+
+    # Channels are read in parallel, but as a mosaic plane can be a whole slide,
+    # at most one plane per channel is read ahead
+    max_workers = min(max_workers or READ_WORKERS, grid[1])
+    return grid, _iter_planes(read_plane, grid, max_workers)
 
 
 def get_mosaic_data(
     czi: CziFile, entry_index: int, czi_dims: str, czi_shape: CziShape
 ) -> np.ndarray:
     """Get the mosaic image data from the CZI file."""
-    bboxes = czi.get_all_mosaic_scene_bounding_boxes()
-    channels = []
-    for channel in range(czi_shape[entry_index]["C"][-1]):
-        planes = []
-        if has_stacks(czi_dims):
-            for plane in range(czi_shape[entry_index]["Z"][-1]):
-                mosaic_data = czi.read_mosaic(
-                    region=tuple([bboxes[0].x, bboxes[0].y, bboxes[0].w, bboxes[0].h]),
-                    scale_factor=1,
-                    C=channel,
-                    Z=plane,
-                ).squeeze()
-                planes.append(mosaic_data)
-        else:
-            mosaic_data = czi.read_mosaic(
-                region=tuple([bboxes[0].x, bboxes[0].y, bboxes[0].w, bboxes[0].h]),
-                scale_factor=1,
-                C=channel,
-            ).squeeze()
-            planes.append(mosaic_data)
-        channels.append(planes)
-    img = np.array(channels)
-    if not has_stacks(czi_dims):
-        img = np.swapaxes(img, 0, 1)
-    return img
+    # (Z, C, Y, X) is the axis order ImageJ expects, so no axis swap is needed
+    grid, planes = iter_mosaic_planes(czi, entry_index, czi_dims, czi_shape)
+    return assemble_planes(grid, planes)
+
+
+def convert_planes(
+    read_planes: Callable[[], Tuple[Tuple[int, int], Iterator[np.ndarray]]],
+    bit_depth: Optional[int],
+    squeeze: bool = False,
+) -> Tuple[Union[np.ndarray, Iterator[np.ndarray]], Tuple[int, ...], np.dtype]:
+    """Convert the planes of a (Z, C) grid to the requested bit depth.
+
+    read_planes returns the grid and an iterator over its planes. If the
+    conversion works pixel by pixel, the planes are converted lazily so that
+    they can be written to disk as they are read. Otherwise the planes are
+    assembled first, as the data range of the whole image is needed, unless
+    the image is larger than MAX_ASSEMBLED_BYTES: then a first pass over the
+    planes finds the range and they are read again to be streamed.
+    Returns the image data (or plane iterator), its shape and its dtype.
+    """
+    grid, planes = read_planes()
+    first = next(planes)
+    planes = chain([first], planes)
+    shape = grid + first.shape
+    if squeeze:
+        shape = tuple(n for n in shape if n != 1)
+    dtype = first.dtype if bit_depth is None else np.dtype(BIT_DEPTH_DTYPES[bit_depth])
+
+    if not needs_data_range(first.dtype, bit_depth):
+        data_range = None
+    elif np.prod(shape) * first.dtype.itemsize <= MAX_ASSEMBLED_BYTES:
+        img = assemble_planes(grid, planes).reshape(shape)
+        return convert_bit_depth(img, bit_depth), shape, dtype
+    else:
+        plane_ranges = [get_data_range(plane) for plane in planes]
+        data_range = (
+            min(lo for lo, _ in plane_ranges),
+            max(hi for _, hi in plane_ranges),
+        )
+        _, planes = read_planes()
+
+    converted = (convert_bit_depth(plane, bit_depth, data_range) for plane in planes)
+    return converted, shape, dtype
+
+
+@lru_cache(maxsize=None)
+def _ensure_dir(path: Path) -> None:
+    """Create the directory path (and its parents) once per process."""
+    path.mkdir(parents=True, exist_ok=True)
+
+
+def is_up_to_date(output_path: Path, source_path: Pathlike) -> bool:
+    """Check if output_path exists and is not older than source_path."""
+    try:
+        output_mtime = output_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return output_mtime >= Path(source_path).stat().st_mtime
+
+
+def _imagej_page_ndim(shape: Tuple[int, ...], dtype: np.dtype) -> int:
+    """Get the number of trailing axes that make up one ImageJ TIF page.
+
+    As in tifffile, uint8 data with 3 or 4 trailing samples is written as RGB
+    pages of (Y, X, S); anything else as grayscale (Y, X) pages.
+    """
+    is_rgb = np.dtype(dtype) == np.uint8 and len(shape) > 2 and shape[-1] in (3, 4)
+    return 3 if is_rgb else 2
+
+
+def write_tif(
+    output_path: Path,
+    img: Union[np.ndarray, Iterable[np.ndarray]],
+    resolution: Tuple[float, ...],
+    export_params: ExportParams,
+    shape: Optional[Tuple[int, ...]] = None,
+    dtype: Optional[np.dtype] = None,
+) -> None:
+    """Write an ImageJ TIF with its resolution and optional compression.
+
+    img is either the image data or an iterable of its planes in order, whose
+    shape and dtype must then be given; the planes are written to disk as they
+    are consumed. The TIF is written under a temporary name and renamed to
+    output_path once it is complete, so an interrupted write never leaves a
+    truncated output.
+    """
+    compression = export_params.compression
+    data = img
+    if isinstance(img, np.ndarray):
+        shape, dtype = img.shape, img.dtype
+    if not isinstance(img, np.ndarray) or not img.flags.c_contiguous:
+        # Views with swapped axes are streamed one page at a time, so tifffile
+        # copies a single page instead of the whole image. Planes can hold
+        # several pages (e.g. all time points of a Z plane), and tifffile only
+        # accepts whole pages when it compresses them, so they are split too
+        page_shape = shape[-_imagej_page_ndim(shape, dtype) :]
+        planes = img
+        if isinstance(img, np.ndarray):
+            planes = (img[index] for index in np.ndindex(shape[: -len(page_shape)]))
+        data = (page for plane in planes for page in plane.reshape(-1, *page_shape))
+    # The temporary name is unique, as parallel workers can write inputs with
+    # the same stem (from different directories) to the same output path
+    # (unlike mkstemp, open() gives the file the usual umask permissions).
+    partial_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}.part")
+    try:
+        with open(partial_path, "xb") as partial_file:
+            imwrite(
+                partial_file,
+                data,
+                shape=shape,
+                dtype=dtype,
+                resolution=(resolution[0], resolution[1]),
+                resolutionunit=RESUNIT.MICROMETER,
+                imagej=True,
+                metadata={"spacing": resolution, "unit": "micron"},
+                compression=compression,
+                # Horizontal differencing improves the deflate ratio of integers
+                predictor=compression is not None and np.dtype(dtype).kind in "ui",
+            )
+        os.replace(partial_path, output_path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
 
 
 # TODO: Clean this up later
@@ -158,21 +429,26 @@ def process_czi(czi_file: Path, export_params: ExportParams) -> None:
         czi = read_czi(czi_file)
         logger.debug("CZI file loaded successfully")
 
-        resolution = get_resolution(czi.meta)
-        logger.info(f"Resolution extracted: {resolution}")
+        # Stream the raw XML rather than building the full tree via czi.meta
+        resolution = get_resolution(czi.reader.read_meta())
+        logger.info("Resolution extracted: %s", resolution)
 
+        # Query the reader once; everything below works on these locals
         czi_dims = czi.dims
+        is_scenes = has_scenes(czi_dims)
+        is_mosaics = has_mosaics(czi_dims)
+        is_stacks = has_stacks(czi_dims)
 
         czi_shape: CziShape = czi.get_dims_shape()
         if len(czi_shape) == 1:
-            logger.info(f"Dimensions of file: {czi_shape}")
+            logger.info("Dimensions of file: %s", czi_shape)
         else:
             logger.info("Dimensions of file: ")
             for n, entry in enumerate(czi_shape):
-                logger.info(f"Entry {n}: {entry}")
+                logger.info("Entry %s: %s", n, entry)
 
         is_homogenous = True
-        if has_scenes(czi_dims):
+        if is_scenes:
             logger.info("Detected multiple scenes")
             if len(czi_shape) > 1 and len(czi_shape) != czi_shape[0]["S"][-1]:
                 logger.debug("Dimensions are not homogenous across scenes")
@@ -184,79 +460,146 @@ def process_czi(czi_file: Path, export_params: ExportParams) -> None:
         else:
             logger.info("File does not contain multiple scenes")
 
-        if has_mosaics(czi_dims):
+        if is_mosaics:
             num_mosaics = sum(1 for entry in czi_shape if "M" in entry)
             logger.info(
-                f"File contains mosaics ({num_mosaics} out of {len(czi_shape)} entries)"
+                "File contains mosaics (%s out of %s entries)",
+                num_mosaics,
+                len(czi_shape),
             )
         else:
             logger.info("File does not contain mosaics")
 
-        if has_stacks(czi_dims):
+        if is_stacks:
             logger.info("File contains stacks")
         else:
             logger.info("File does not contain stacks")
 
-        if has_scenes(czi_dims) and is_homogenous:
+        if is_scenes and is_homogenous:
             entry_indexes = range(czi_shape[0]["S"][-1])
         else:
             entry_indexes = range(len(czi_shape))
 
-        for entry_index in entry_indexes:
-            if has_mosaics(czi_dims):
-                is_mosaic = czi_shape[entry_index]["M"][-1] > 0
-            else:
-                is_mosaic = False
-
-            if not is_mosaic:
-                logger.info(f"Processing entry {entry_index}")
-                if has_stacks(czi_dims):
-                    img, dims = get_stack_data(czi, entry_index)
+        # Samples (A) only exist for RGB pixel types; converting them would
+        # turn the samples into grayscale channels, so RGB keeps its dtype
+        bit_depth = export_params.bit_depth
+        if bit_depth is not None and "A" in czi_dims:
+            logger.warning(
+                "Keeping the source bit depth of RGB data, ignoring --bit-depth %s",
+                bit_depth,
+            )
+            bit_depth = None
+
+        # The output directory and file stem are the same for every entry, so
+        # the directory is only made sure of once, not per entry or per file
+        output_dir = export_params.output_dir
+        _ensure_dir(output_dir)
+        stem = Path(czi_file).stem
+
+        # Write each entry on a background thread so that the TIFF encoding of
+        # one entry overlaps with reading and decoding the next one
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            pending_write = None
+            for entry_index in entry_indexes:
+                output_path = output_dir / f"{stem}_{entry_index}.tif"
+                if export_params.skip_existing and is_up_to_date(output_path, czi_file):
+                    logger.info("Up-to-date, skipping: %s", output_path)
+                    continue
+
+                if is_mosaics:
+                    is_mosaic = czi_shape[entry_index]["M"][-1] > 0
                 else:
-                    img, dims = get_scene_data(czi, entry_index)
-                logger.info(f"Extracted image data shape: {img.shape}")
-                logger.info(f"Extracted dimensions: {dims}")
-                img = img.squeeze()
-                logger.info(f"Squeezed image data shape: {img.shape}")
-                if len(img.shape) > 3:
-                    # logger.debug("Image has more than 3 dimensions, swapping channel and Z axes")
-                    if not has_stacks(czi_dims):
+                    is_mosaic = False
+
+                if is_mosaic:
+                    logger.info("Processing mosaic entry %s", entry_index)
+                    img, shape, dtype = convert_planes(
+                        partial(
+                            iter_mosaic_planes,
+                            czi,
+                            entry_index,
+                            czi_dims,
+                            czi_shape,
+                            export_params.read_workers,
+                        ),
+                        bit_depth,
+                    )
+                    logger.info("Mosaic image data shape: %s", shape)
+                elif is_stacks:
+                    logger.info("Processing entry %s", entry_index)
+                    img, shape, dtype = convert_planes(
+                        partial(
+                            iter_stack_planes,
+                            czi,
+                            entry_index,
+                            export_params.read_workers,
+                        ),
+                        bit_depth,
+                        squeeze=True,
+                    )
+                    logger.info("Squeezed image data shape: %s", shape)
+                else:
+                    logger.info("Processing entry %s", entry_index)
+                    img, dims = get_scene_data(
+                        czi, entry_index, export_params.read_workers
+                    )
+                    logger.info("Extracted image data shape: %s", img.shape)
+                    logger.info("Extracted dimensions: %s", dims)
+                    img = img.squeeze()
+                    logger.info("Squeezed image data shape: %s", img.shape)
+                    if len(img.shape) > 3:
+                        # read_image returns the scene channel-major; the swap
+                        # is only a view, which write_tif streams page by
+                        # page instead of copying it as a whole
                         img = np.swapaxes(img, 0, 1)
-                    logger.info(f"Swapped axes image data shape: {img.shape}")
-            else:
-                logger.info(f"Processing mosaic entry {entry_index}")
-                img = get_mosaic_data(czi, entry_index, czi_dims, czi_shape)
-                logger.info(f"Mosaic image data shape: {img.shape}")
-
-            export_params.output_dir.mkdir(parents=True, exist_ok=True)
-
-            output_path = (
-                export_params.output_dir / f"{Path(czi_file).stem}_{entry_index}.tif"
-            )
-            logger.info(f"Exporting to: {output_path}")
+                        logger.info("Swapped axes image data shape: %s", img.shape)
+                    img = convert_bit_depth(img, bit_depth)
+                    shape, dtype = img.shape, img.dtype
+                # Stacks and mosaics come as a lazy plane iterator whenever the
+                # bit depth conversion allows it, so that they are streamed to
+                # disk by the writer instead of being held in memory at once
+                logger.info("Output data type: %s", dtype)
+
+                logger.info("Exporting to: %s", output_path)
+
+                # Wait for the previous entry before queueing the next write,
+                # so at most two entries are held in memory at once
+                if pending_write is not None:
+                    pending_write.result()
+                pending_write = writer.submit(
+                    write_tif,
+                    output_path,
+                    img,
+                    resolution,
+                    export_params,
+                    shape,
+                    dtype,
+                )
+                # Only the pending write should keep this entry alive, so it
+                # can be freed as soon as it is written, even mid-read of the
+                # next entry
+                del img
 
-            imwrite(
-                output_path,
-                img,
-                resolution=(resolution[0], resolution[1]),
-                resolutionunit=RESUNIT.MICROMETER,
-                imagej=True,
-                metadata={"spacing": resolution, "unit": "micron"},
-            )
+            if pending_write is not None:
+                pending_write.result()
 
     except Exception as e:
-        logger.error(f"Error processing file {czi_file}: {e}")
+        logger.error("Error processing file %s: %s", czi_file, e)
         raise
 
 
 def process_lif(lif_path: Path, export_params: ExportParams) -> None:
     """Process a single LIF file and extract resolution information."""
-    logger.info(f"Processing LIF file: {Path(lif_path).name}")
+    logger.info("Processing LIF file: %s", Path(lif_path).name)
 
     lif_file = LifFile(lif_path)
 
+    output_dir = export_params.output_dir
+    _ensure_dir(output_dir)
+    stem = Path(lif_path).stem
+
     for image in lif_file.get_iter_image():
-        logger.info(f"Processing image: {image.name}")
+        logger.info("Processing image: %s", image.name)
 
         resolution = image.scale
         if resolution is None:
@@ -265,41 +608,46 @@ def process_lif(lif_path: Path, export_params: ExportParams) -> None:
             )
             resolution = (1, 1, 1)
         else:
-            logger.info(f"Extracted resolution: {resolution}")
+            logger.info("Extracted resolution: %s", resolution)
+
+        output_path = output_dir / f"{stem}_{image.name}.tif"
+        if export_params.skip_existing and is_up_to_date(output_path, lif_path):
+            logger.info("Up-to-date, skipping: %s", output_path)
+            continue
 
-        # Get image data
-        img_data = np.array(image.get_frame())
-        logger.info(f"Image data shape: {img_data.shape}")
+        # Get image data; asarray wraps the frame's pixel buffer (read-only)
+        # instead of copying the whole frame once more
+        img_data = np.asarray(image.get_frame())
+        logger.info("Image data shape: %s", img_data.shape)
+        img_data = convert_bit_depth(img_data, export_params.bit_depth)
+        logger.info("Output data type: %s", img_data.dtype)
 
         # Export to TIF
-        export_params.output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = (
-            export_params.output_dir / f"{Path(lif_path).stem}_{image.name}.tif"
-        )
-        logger.info(f"Exporting to: {output_path}")
-
-        imwrite(
-            output_path,
-            img_data,
-            resolution=(resolution[0], resolution[1]),
-            resolutionunit=RESUNIT.MICROMETER,
-            imagej=True,
-            metadata={"spacing": resolution, "unit": "micron"},
-        )
+        logger.info("Exporting to: %s", output_path)
+
+        write_tif(output_path, img_data, resolution, export_params)
+        # Free this frame before the next one is read
+        del img_data
+
+
+# Converter for each of the formats.SUPPORTED_EXTENSIONS, which the CLI
+# filters its inputs on; a new reader needs its extension added there as well
+FILE_HANDLERS: Dict[str, Callable[[Path, ExportParams], None]] = {
+    ".czi": process_czi,
+    ".lif": process_lif,
+}
 
 
 def process_file(czi_file: Pathlike, export_params: ExportParams) -> None:
     """Process a single CZI file and extract resolution information."""
-    logger.info(f"Processing CZI file: {Path(czi_file).name}")
+    logger.info("Processing CZI file: %s", Path(czi_file).name)
 
     if isinstance(czi_file, str):
         czi_file = Path(czi_file)
 
     file_extension = czi_file.suffix.lower()
-    if file_extension == ".czi":
-        process_czi(czi_file, export_params)
-    elif file_extension == ".lif":
-        process_lif(czi_file, export_params)
-    else:
-        logger.error(f"Unsupported file format: {file_extension}")
+    handler = FILE_HANDLERS.get(file_extension)
+    if handler is None:
+        logger.error("Unsupported file format: %s", file_extension)
         raise ValueError(f"Unsupported file format: {file_extension}")
+    handler(czi_file, export_params)
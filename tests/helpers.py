@@ -0,0 +1,12 @@
+"""Shared stand-ins for the CZI reader, used by the read and integration tests."""
+
+from collections import namedtuple
+
+from aicspylibczi import CziFile
+
+# Attribute names of a CziFile, listed once: mocks built from them fail on
+# misspelled reader methods. reader is only set on instances (by __init__).
+CZI_SPEC = [*dir(CziFile), "reader"]
+
+# Mosaic bounding boxes are only read through their x, y, w and h attributes
+BBox = namedtuple("BBox", "x y w h")
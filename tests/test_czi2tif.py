@@ -1,330 +1,388 @@
 """Tests for czi2tif main functionality."""
 
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import patch
 from pathlib import Path
-from click.testing import CliRunner
 
-from czi2tif.czi2tif import main
+import pytest
 
+from czi2tif import main as package_main
+from czi2tif.czi2tif import iter_input_files, main
 
-class TestMainFunctionality:
-    """Tests for the main czi2tif functionality."""
-
-    def test_main_function_exists(self):
-        """Test that the main function can be imported."""
-        from czi2tif import main
-
-        assert main is not None
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_single_czi_file(self, mock_setup_logging, mock_process_file):
-        """Test CLI with a single CZI file."""
-        runner = CliRunner()
-
-        with runner.isolated_filesystem():
-            # Create a test CZI file
-            test_file = Path("test.czi")
-            test_file.touch()
+def touch_files(root, *names):
+    """Create empty files below root with one open/close each (no utime)."""
+    for name in names:
+        os.close(os.open(root / name, os.O_CREAT | os.O_WRONLY, 0o644))
 
-            result = runner.invoke(main, [str(test_file)])
 
-            assert result.exit_code == 0
-            mock_process_file.assert_called_once()
-            mock_setup_logging.assert_called_once()
+def run_cli(args):
+    """Run the CLI in-process; errors propagate instead of becoming exit codes."""
+    return main.main(args, standalone_mode=False)
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_single_lif_file(self, mock_setup_logging, mock_process_file):
-        """Test CLI with a single LIF file."""
-        runner = CliRunner()
 
-        with runner.isolated_filesystem():
-            # Create a test LIF file
-            test_file = Path("test.lif")
-            test_file.touch()
+@pytest.fixture(scope="module")
+def stub_files(tmp_path_factory):
+    """Empty input files shared by the single-file CLI tests."""
+    stub_dir = tmp_path_factory.mktemp("stubs")
+    touch_files(stub_dir, "test.czi", "test.lif", "test.txt")
+    return stub_dir
 
-            result = runner.invoke(main, [str(test_file)])
 
-            assert result.exit_code == 0
-            mock_process_file.assert_called_once()
-            mock_setup_logging.assert_called_once()
-
-    def test_cli_unsupported_file_format(self):
-        """Test CLI with an unsupported file format."""
-        runner = CliRunner()
-
-        with runner.isolated_filesystem():
-            # Create a test file with unsupported extension
-            test_file = Path("test.txt")
-            test_file.touch()
-
-            result = runner.invoke(main, [str(test_file)])
-
-            assert result.exit_code != 0
-
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_directory_processing(self, mock_setup_logging, mock_process_file):
-        """Test CLI with directory containing multiple files."""
-        runner = CliRunner()
+class TestMainFunctionality:
+    """Tests for the main czi2tif functionality."""
 
-        with runner.isolated_filesystem():
-            # Create test directory with files
-            test_dir = Path("test_dir")
-            test_dir.mkdir()
+    @pytest.fixture(autouse=True)
+    def _mocks(self):
+        """Patch out file conversion and logging setup for every CLI test."""
+        with (
+            patch("czi2tif.read.process_file") as mock_process_file,
+            patch("czi2tif.czi2tif.setup_logging") as mock_setup_logging,
+        ):
+            self.mock_process_file = mock_process_file
+            self.mock_setup_logging = mock_setup_logging
+            yield
 
-            czi_file = test_dir / "test1.czi"
-            lif_file = test_dir / "test2.lif"
-            txt_file = test_dir / "test3.txt"  # Should be ignored
+    def test_main_function_exists(self):
+        """Test that the main function can be imported from the package."""
+        assert package_main is main
 
-            czi_file.touch()
-            lif_file.touch()
-            txt_file.touch()
+    def test_cli_import_is_lightweight(self):
+        """Test that loading the CLI does not import the readers or numpy."""
+        code = (
+            "import sys, czi2tif.czi2tif; "
+            "print(sorted({'numpy', 'tifffile', 'czi2tif.read'} & set(sys.modules)))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
 
-            result = runner.invoke(main, [str(test_dir)])
+        assert result.stdout.strip() == "[]"
 
-            assert result.exit_code == 0
-            # Should be called twice (once for each supported file)
-            assert mock_process_file.call_count == 2
-            mock_setup_logging.assert_called_once()
+    def test_iter_input_files(self, tmp_path):
+        """Test the directory walk descends only when recursive and filters names."""
+        (tmp_path / "sub").mkdir()
+        touch_files(tmp_path, "a.czi", "b.LIF", "c.txt", "sub/d.czi", "sub/e.tif")
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_recursive_processing(self, mock_setup_logging, mock_process_file):
-        """Test CLI with recursive directory processing."""
-        runner = CliRunner()
+        def walk(recursive):
+            files = iter_input_files(tmp_path, recursive, (".czi", ".lif"))
+            return sorted(path.relative_to(tmp_path).as_posix() for path in files)
 
-        with runner.isolated_filesystem():
-            # Create nested directory structure
-            test_dir = Path("test_dir")
-            sub_dir = test_dir / "subdir"
-            sub_dir.mkdir(parents=True)
+        assert walk(recursive=False) == ["a.czi", "b.LIF"]
+        assert walk(recursive=True) == ["a.czi", "b.LIF", "sub/d.czi"]
 
-            czi_file1 = test_dir / "test1.czi"
-            czi_file2 = sub_dir / "test2.czi"
+    def test_iter_input_files_skips_unreadable_directory(self, tmp_path, monkeypatch):
+        """Test that a directory that cannot be listed is skipped, not fatal."""
+        (tmp_path / "locked").mkdir()
+        (tmp_path / "open").mkdir()
+        touch_files(tmp_path, "a.czi", "locked/b.czi", "open/c.czi")
+        scandir = os.scandir
 
-            czi_file1.touch()
-            czi_file2.touch()
+        def guarded_scandir(path):
+            if Path(path).name == "locked":
+                raise PermissionError(13, "Permission denied", str(path))
+            return scandir(path)
 
-            result = runner.invoke(main, [str(test_dir), "--recursive"])
+        monkeypatch.setattr("czi2tif.czi2tif.os.scandir", guarded_scandir)
 
-            assert result.exit_code == 0
-            # Should be called twice (both files found recursively)
-            assert mock_process_file.call_count == 2
-            mock_setup_logging.assert_called_once()
+        files = iter_input_files(tmp_path, True, (".czi",))
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_custom_output_directory(self, mock_setup_logging, mock_process_file):
-        """Test CLI with custom output directory."""
-        runner = CliRunner()
+        assert sorted(path.name for path in files) == ["a.czi", "c.czi"]
 
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
-
-            result = runner.invoke(main, [str(test_file), "--output", "custom_output"])
+    def test_cli_single_czi_file(self, stub_files):
+        """Test CLI with a single CZI file."""
+        test_file = stub_files / "test.czi"
 
-            assert result.exit_code == 0
-            mock_process_file.assert_called_once()
+        run_cli([str(test_file)])
 
-            # Check that ExportParams was created with custom output directory
-            call_args = mock_process_file.call_args
-            export_params = call_args[0][1]
-            assert export_params.output_dir == Path("custom_output")
+        self.mock_process_file.assert_called_once()
+        self.mock_setup_logging.assert_called_once()
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_bit_depth_option(self, mock_setup_logging, mock_process_file):
-        """Test CLI with custom bit depth."""
-        runner = CliRunner()
+    def test_cli_single_lif_file(self, stub_files):
+        """Test CLI with a single LIF file."""
+        test_file = stub_files / "test.lif"
 
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
+        run_cli([str(test_file)])
 
-            result = runner.invoke(main, [str(test_file), "--bit-depth", "32"])
+        self.mock_process_file.assert_called_once()
+        self.mock_setup_logging.assert_called_once()
 
-            assert result.exit_code == 0
-            mock_process_file.assert_called_once()
+    def test_cli_unsupported_file_format(self, stub_files):
+        """Test CLI with an unsupported file format."""
+        test_file = stub_files / "test.txt"
 
-            # Check that ExportParams was created with custom bit depth
-            call_args = mock_process_file.call_args
-            export_params = call_args[0][1]
-            assert export_params.bit_depth == 32
+        with pytest.raises(ValueError, match="must be a CZI or LIF file"):
+            run_cli([str(test_file)])
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_verbose_logging(self, mock_setup_logging, mock_process_file):
-        """Test CLI with verbose logging enabled."""
-        runner = CliRunner()
+    def test_cli_directory_processing(self, tmp_path):
+        """Test CLI with directory containing multiple files."""
+        # Create test directory with files
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
 
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
+        # test3.txt should be ignored
+        touch_files(test_dir, "test1.czi", "test2.lif", "test3.txt")
 
-            result = runner.invoke(main, [str(test_file), "--verbose"])
+        run_cli([str(test_dir)])
 
-            assert result.exit_code == 0
-            mock_setup_logging.assert_called_once()
+        # Should be called twice (once for each supported file)
+        assert self.mock_process_file.call_count == 2
+        self.mock_setup_logging.assert_called_once()
 
-            # Check that setup_logging was called with DEBUG level
-            call_args = mock_setup_logging.call_args
-            assert call_args[1]["log_level"] == "DEBUG"
+    def test_cli_recursive_processing(self, tmp_path):
+        """Test CLI with recursive directory processing."""
+        # Create nested directory structure
+        test_dir = tmp_path / "test_dir"
+        sub_dir = test_dir / "subdir"
+        sub_dir.mkdir(parents=True)
+
+        touch_files(test_dir, "test1.czi", "subdir/test2.czi")
+
+        run_cli([str(test_dir), "--recursive"])
+
+        # Should be called twice (both files found recursively)
+        assert self.mock_process_file.call_count == 2
+        self.mock_setup_logging.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "flags, export_fields, logging_kwargs",
+        [
+            (["--output", "custom_output"], {"output_dir": Path("custom_output")}, {}),
+            (["--bit-depth", "32"], {"bit_depth": 32}, {}),
+            (["--verbose"], {}, {"log_level": "DEBUG"}),
+            (["--quiet"], {}, {"quiet": True}),
+            (
+                ["--log-file", "test.log"],
+                {},
+                {"log_file": Path("test.log"), "file_output": True},
+            ),
+        ],
+        ids=["output", "bit-depth", "verbose", "quiet", "log-file"],
+    )
+    def test_cli_option(
+        self, stub_files, tmp_path, monkeypatch, flags, export_fields, logging_kwargs
+    ):
+        """Test that a CLI option reaches the ExportParams or the logging setup."""
+        # Relative output paths are created below tmp_path, not in the CWD
+        monkeypatch.chdir(tmp_path)
+        run_cli([str(stub_files / "test.czi"), *flags])
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_quiet_logging(self, mock_setup_logging, mock_process_file):
-        """Test CLI with quiet logging enabled."""
-        runner = CliRunner()
+        self.mock_process_file.assert_called_once()
+        self.mock_setup_logging.assert_called_once()
 
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
+        export_params = self.mock_process_file.call_args[0][1]
+        for field, value in export_fields.items():
+            assert getattr(export_params, field) == value
+        logging_call = self.mock_setup_logging.call_args[1]
+        for key, value in logging_kwargs.items():
+            assert logging_call[key] == value
 
-            result = runner.invoke(main, [str(test_file), "--quiet"])
+    def test_cli_bit_depth_default(self, stub_files):
+        """Test that the source bit depth is kept unless --bit-depth is given."""
+        run_cli([str(stub_files / "test.czi")])
 
-            assert result.exit_code == 0
-            mock_setup_logging.assert_called_once()
+        assert self.mock_process_file.call_args[0][1].bit_depth is None
 
-            # Check that setup_logging was called with quiet=True
-            call_args = mock_setup_logging.call_args
-            assert call_args[1]["quiet"] is True
+    def test_cli_compression_option(self, stub_files):
+        """Test CLI with zlib compression and the uncompressed default."""
+        test_file = stub_files / "test.czi"
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_log_file_option(self, mock_setup_logging, mock_process_file):
-        """Test CLI with log file option."""
-        runner = CliRunner()
+        run_cli([str(test_file)])
+        assert self.mock_process_file.call_args[0][1].compression is None
 
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
+        run_cli([str(test_file), "--compression", "zlib"])
+        assert self.mock_process_file.call_args[0][1].compression == "zlib"
 
-            result = runner.invoke(main, [str(test_file), "--log-file", "test.log"])
+    def test_cli_skip_existing_option(self, stub_files):
+        """Test CLI with --skip-existing to keep up-to-date files."""
+        test_file = stub_files / "test.czi"
 
-            assert result.exit_code == 0
-            mock_setup_logging.assert_called_once()
+        run_cli([str(test_file)])
+        assert self.mock_process_file.call_args[0][1].skip_existing is False
 
-            # Check that setup_logging was called with log file
-            call_args = mock_setup_logging.call_args
-            assert call_args[1]["log_file"] == Path("test.log")
-            assert call_args[1]["file_output"] is True
+        run_cli([str(test_file), "--skip-existing"])
+        assert self.mock_process_file.call_args[0][1].skip_existing is True
 
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_verbose_and_quiet_conflict(
-        self, mock_setup_logging, mock_process_file
+    @pytest.mark.parametrize("output", [None, "out", "deep/out"])
+    @pytest.mark.parametrize("quiet", [False, True])
+    @pytest.mark.parametrize("verbose", [False, True])
+    @pytest.mark.parametrize("bit_depth", ["8", "16", "32"])
+    def test_cli_option_combinations(
+        self, stub_files, tmp_path, monkeypatch, bit_depth, verbose, quiet, output
     ):
-        """Test CLI with both verbose and quiet flags (should prioritize verbose)."""
-        runner = CliRunner()
-
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
-
-            result = runner.invoke(main, [str(test_file), "--verbose", "--quiet"])
-
-            assert result.exit_code == 0
-            mock_setup_logging.assert_called_once()
-
-            # Check that setup_logging was called with verbose settings (quiet overridden)
-            call_args = mock_setup_logging.call_args
-            assert call_args[1]["log_level"] == "DEBUG"
-            assert call_args[1]["quiet"] is False
-
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_file_processing_error(self, mock_setup_logging, mock_process_file):
+        """Test combined CLI options (verbose takes priority over quiet)."""
+        # Relative output paths are created below tmp_path, not in the CWD
+        monkeypatch.chdir(tmp_path)
+        args = [str(stub_files / "test.czi"), "--bit-depth", bit_depth]
+        if verbose:
+            args.append("--verbose")
+        if quiet:
+            args.append("--quiet")
+        if output is not None:
+            args += ["--output", output]
+
+        run_cli(args)
+
+        export_params = self.mock_process_file.call_args[0][1]
+        assert export_params.bit_depth == int(bit_depth)
+        expected_output = stub_files / "tif" if output is None else Path(output)
+        assert export_params.output_dir == expected_output
+
+        logging_call = self.mock_setup_logging.call_args[1]
+        if quiet and not verbose:
+            assert logging_call == {"quiet": True}
+        else:
+            assert logging_call["quiet"] is False
+            assert logging_call["log_level"] == ("DEBUG" if verbose else "INFO")
+
+    def test_cli_creates_output_directory(self, stub_files, tmp_path):
+        """Test that the CLI creates a nested output directory once up front."""
+        nested_output = tmp_path / "nested" / "output"
+
+        run_cli([str(stub_files / "test.czi"), "--output", str(nested_output)])
+
+        assert nested_output.is_dir()
+        self.mock_process_file.assert_called_once()
+
+    def test_cli_file_processing_error(self, stub_files):
         """Test CLI behavior when file processing fails."""
-        runner = CliRunner()
+        self.mock_process_file.side_effect = Exception("Processing failed")
 
-        mock_process_file.side_effect = Exception("Processing failed")
+        test_file = stub_files / "test.czi"
 
-        with runner.isolated_filesystem():
-            test_file = Path("test.czi")
-            test_file.touch()
+        run_cli([str(test_file)])
 
-            result = runner.invoke(main, [str(test_file)])
+        self.mock_process_file.assert_called_once()
+        self.mock_setup_logging.assert_called_once()
 
-            assert result.exit_code == 0  # Should not crash, just log error
-            mock_process_file.assert_called_once()
-            mock_setup_logging.assert_called_once()
-
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_directory_processing_with_match(
-        self, mock_setup_logging, mock_process_file
-    ):
+    def test_cli_directory_processing_with_match(self, tmp_path):
         """Test CLI directory processing with --match filters only matching files."""
-        runner = CliRunner()
-
-        with runner.isolated_filesystem():
-            test_dir = Path("test_dir")
-            test_dir.mkdir()
-
-            # Files: only those containing 'match' should be processed
-            (test_dir / "a_match_1.czi").touch()
-            (test_dir / "a_unrelated_2.czi").touch()
-            (test_dir / "b_match_3.lif").touch()
-            (test_dir / "ignore.txt").touch()  # unsupported
-
-            result = runner.invoke(main, [str(test_dir), "--match", "match"])
-
-            assert result.exit_code == 0
-            # Expect only 2 matching files (czi + lif)
-            assert mock_process_file.call_count == 2
-            processed = sorted(
-                call.args[0].name for call in mock_process_file.call_args_list
-            )
-            assert processed == ["a_match_1.czi", "b_match_3.lif"]
-            mock_setup_logging.assert_called_once()
-
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_recursive_processing_with_match(
-        self, mock_setup_logging, mock_process_file
-    ):
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+
+        # Files: only those containing 'match' should be processed
+        touch_files(
+            test_dir,
+            "a_match_1.czi",
+            "a_unrelated_2.czi",
+            "b_match_3.lif",
+            "ignore.txt",
+        )
+
+        run_cli([str(test_dir), "--match", "match"])
+
+        # Expect only 2 matching files (czi + lif)
+        assert self.mock_process_file.call_count == 2
+        processed = sorted(
+            call.args[0].name for call in self.mock_process_file.call_args_list
+        )
+        assert processed == ["a_match_1.czi", "b_match_3.lif"]
+        self.mock_setup_logging.assert_called_once()
+
+    def test_cli_recursive_processing_with_match(self, tmp_path):
         """Test CLI recursive processing with --match filters across subdirectories."""
-        runner = CliRunner()
-
-        with runner.isolated_filesystem():
-            base = Path("base_dir")
-            (base / "sub1").mkdir(parents=True)
-            (base / "sub2").mkdir(parents=True)
-
-            # Create files across subdirs
-            (base / "sub1" / "match_file1.czi").touch()
-            (base / "sub1" / "nope1.czi").touch()
-            (base / "sub2" / "match_file2.lif").touch()
-            (base / "sub2" / "nope2.lif").touch()
-
-            result = runner.invoke(main, [str(base), "--recursive", "--match", "match"])
-
-            assert result.exit_code == 0
-            assert mock_process_file.call_count == 2
-            processed = sorted(
-                call.args[0].name for call in mock_process_file.call_args_list
-            )
-            assert processed == ["match_file1.czi", "match_file2.lif"]
-            mock_setup_logging.assert_called_once()
-
-    @patch("czi2tif.czi2tif.process_file")
-    @patch("czi2tif.czi2tif.setup_logging")
-    def test_cli_match_no_results(self, mock_setup_logging, mock_process_file):
+        base = tmp_path / "base_dir"
+        (base / "sub1").mkdir(parents=True)
+        (base / "sub2").mkdir(parents=True)
+
+        # Create files across subdirs
+        touch_files(
+            base,
+            "sub1/match_file1.czi",
+            "sub1/nope1.czi",
+            "sub2/match_file2.lif",
+            "sub2/nope2.lif",
+        )
+
+        run_cli([str(base), "--recursive", "--match", "match"])
+
+        assert self.mock_process_file.call_count == 2
+        processed = sorted(
+            call.args[0].name for call in self.mock_process_file.call_args_list
+        )
+        assert processed == ["match_file1.czi", "match_file2.lif"]
+        self.mock_setup_logging.assert_called_once()
+
+    def test_cli_match_wildcard(self, tmp_path):
+        """Test CLI --match with shell-style wildcards."""
+        test_dir = tmp_path / "wildcard_dir"
+        test_dir.mkdir()
+        touch_files(
+            test_dir, "sample_1_day2.czi", "sample_2_day1.czi", "control_day2.lif"
+        )
+
+        run_cli([str(test_dir), "--match", "sample_*_day2"])
+
+        processed = [call[0][0].name for call in self.mock_process_file.call_args_list]
+        assert processed == ["sample_1_day2.czi"]
+
+    def test_cli_match_no_results(self, tmp_path):
         """Test CLI with --match that yields no files; should not process any files."""
-        runner = CliRunner()
-
-        with runner.isolated_filesystem():
-            test_dir = Path("empty_match")
-            test_dir.mkdir()
-            # Create some files that do not match
-            (test_dir / "abc.czi").touch()
-            (test_dir / "def.lif").touch()
-
-            result = runner.invoke(main, [str(test_dir), "--match", "zzz"])
-
-            assert result.exit_code == 0
-            mock_process_file.assert_not_called()
-            mock_setup_logging.assert_called_once()
+        test_dir = tmp_path / "empty_match"
+        test_dir.mkdir()
+        # Create some files that do not match
+        touch_files(test_dir, "abc.czi", "def.lif")
+
+        run_cli([str(test_dir), "--match", "zzz"])
+
+        self.mock_process_file.assert_not_called()
+        self.mock_setup_logging.assert_called_once()
+
+    def test_cli_directory_uppercase_extensions(self, tmp_path):
+        """Test CLI directory processing matches file extensions case-insensitively."""
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+        touch_files(test_dir, "upper.CZI", "mixed.Lif", "notes.txt")
+
+        run_cli([str(test_dir)])
+
+        processed = sorted(
+            call.args[0].name for call in self.mock_process_file.call_args_list
+        )
+        assert processed == ["mixed.Lif", "upper.CZI"]
+
+    @patch("czi2tif.czi2tif.ProcessPoolExecutor", ThreadPoolExecutor)
+    def test_cli_parallel_jobs(self, tmp_path):
+        """Test CLI directory processing with --jobs dispatches every file to the pool."""
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+        touch_files(test_dir, "a.czi", "b.czi", "c.lif")
+
+        run_cli([str(test_dir), "--jobs", "2"])
+
+        assert self.mock_process_file.call_count == 3
+        processed = sorted(
+            call.args[0].name for call in self.mock_process_file.call_args_list
+        )
+        assert processed == ["a.czi", "b.czi", "c.lif"]
+        # The reader threads are shared out between the workers
+        export_params = self.mock_process_file.call_args.args[1]
+        assert export_params.read_workers == max(1, (os.cpu_count() or 1) // 2)
+
+    def test_cli_parallel_jobs_broken_pool(self, tmp_path):
+        """Test that a dead worker process is logged instead of aborting the CLI."""
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+        touch_files(test_dir, "a.czi", "b.czi", "c.lif")
+
+        class BrokenPool(ThreadPoolExecutor):
+            """Pool that refuses work like a process pool whose worker was killed."""
+
+            def submit(self, fn, *args, **kwargs):
+                raise BrokenProcessPool("A child process terminated abruptly")
+
+        with (
+            patch("czi2tif.czi2tif.ProcessPoolExecutor", BrokenPool),
+            patch("czi2tif.czi2tif.logger") as mock_logger,
+        ):
+            run_cli([str(test_dir), "--jobs", "2"])
+
+        self.mock_process_file.assert_not_called()
+        message, count, names = mock_logger.error.call_args.args
+        assert message.startswith("Worker pool stopped")
+        assert count == 3
+        assert sorted(names.split(", ")) == ["a.czi", "b.czi", "c.lif"]
@@ -1,64 +1,115 @@
 """Tests for czi2tif.export module."""
 import pytest
+import numpy as np
+from dataclasses import FrozenInstanceError
 from pathlib import Path
 
-from czi2tif.export import ExportParams
+from czi2tif.export import ExportParams, convert_bit_depth
 
 
 class TestExportParams:
     """Tests for the ExportParams dataclass."""
 
-    def test_export_params_creation(self):
-        """Test ExportParams creation with valid parameters."""
+    @pytest.mark.parametrize(
+        "output_dir, bit_depth",
+        [
+            (Path("/tmp/test"), 8),
+            (Path("/tmp/test"), 16),
+            (Path("/tmp/test"), 32),
+            (Path("/other"), 16),
+        ],
+    )
+    def test_export_params(self, output_dir, bit_depth):
+        """Test ExportParams creation, defaults and equality comparison."""
+        params = ExportParams(output_dir=output_dir, bit_depth=bit_depth)
+        
+        assert params.output_dir == output_dir
+        assert params.bit_depth == bit_depth
+        assert params.compression is None and params.skip_existing is False
+        assert ExportParams(output_dir=output_dir).bit_depth is None
+        assert params == ExportParams(output_dir=output_dir, bit_depth=bit_depth)
+        assert params != ExportParams(output_dir=Path("/elsewhere"), bit_depth=bit_depth)
+        assert params != ExportParams(output_dir=output_dir, bit_depth=bit_depth * 2)
+
+    def test_export_params_immutability(self):
+        """Test that ExportParams is immutable (frozen dataclass)."""
         output_dir = Path("/tmp/test")
         bit_depth = 16
         
         params = ExportParams(output_dir=output_dir, bit_depth=bit_depth)
         
+        # This should work - we can access the attributes
         assert params.output_dir == output_dir
         assert params.bit_depth == bit_depth
+        
+        # Assigning to a field raises, so one instance can be shared safely
+        with pytest.raises(FrozenInstanceError):
+            params.bit_depth = 32
+        assert params.bit_depth == bit_depth
+        
+        # Being frozen also makes the params hashable
+        assert hash(params) == hash(ExportParams(output_dir=output_dir, bit_depth=bit_depth))
+        
+        # Fields live in slots, there is no per-instance __dict__
+        assert not hasattr(params, "__dict__")
+
 
-    def test_export_params_path_conversion(self):
-        """Test ExportParams with string path conversion."""
-        output_dir = "/tmp/test"
-        bit_depth = 32
+class TestConvertBitDepth:
+    """Tests for converting image data to the requested bit depth."""
+
+    def test_matching_dtype_is_unchanged(self):
+        """Test that data already in the target dtype is returned as is."""
+        img = np.array([[0, 1000, 4095]], dtype=np.uint16)
         
-        params = ExportParams(output_dir=Path(output_dir), bit_depth=bit_depth)
+        assert convert_bit_depth(img, 16) is img
+
+    def test_no_bit_depth_is_unchanged(self):
+        """Test that data is returned as is when no bit depth is requested."""
+        img = np.array([[0, 100, 255]], dtype=np.uint8)
         
-        assert params.output_dir == Path(output_dir)
-        assert params.bit_depth == bit_depth
+        assert convert_bit_depth(img, None) is img
 
-    def test_export_params_different_bit_depths(self):
-        """Test ExportParams with different bit depths."""
-        output_dir = Path("/tmp/test")
+    def test_downcast_stretches_range(self):
+        """Test that 16-bit data is stretched onto the full 8-bit range."""
+        img = np.array([[100, 2100, 4100]], dtype=np.uint16)
         
-        for bit_depth in [8, 16, 32]:
-            params = ExportParams(output_dir=output_dir, bit_depth=bit_depth)
-            assert params.bit_depth == bit_depth
+        result = convert_bit_depth(img, 8)
+        
+        assert result.dtype == np.uint8
+        assert result.tolist() == [[0, 128, 255]]
 
-    def test_export_params_equality(self):
-        """Test ExportParams equality comparison."""
-        output_dir = Path("/tmp/test")
-        bit_depth = 16
+    def test_upcast_keeps_values(self):
+        """Test that widening integer data keeps the pixel values."""
+        img = np.array([[0, 17, 255]], dtype=np.uint8)
         
-        params1 = ExportParams(output_dir=output_dir, bit_depth=bit_depth)
-        params2 = ExportParams(output_dir=output_dir, bit_depth=bit_depth)
-        params3 = ExportParams(output_dir=output_dir, bit_depth=32)
+        result = convert_bit_depth(img, 16)
         
-        assert params1 == params2
-        assert params1 != params3
+        assert result.dtype == np.uint16
+        assert result.tolist() == [[0, 17, 255]]
 
-    def test_export_params_immutability(self):
-        """Test that ExportParams is immutable (frozen dataclass)."""
-        output_dir = Path("/tmp/test")
-        bit_depth = 16
+    def test_float_output(self):
+        """Test that 32-bit output is float32 with unchanged values."""
+        img = np.array([[0, 17, 4095]], dtype=np.uint16)
         
-        params = ExportParams(output_dir=output_dir, bit_depth=bit_depth)
+        result = convert_bit_depth(img, 32)
         
-        # This should work - we can access the attributes
-        assert params.output_dir == output_dir
-        assert params.bit_depth == bit_depth
+        assert result.dtype == np.float32
+        assert result.tolist() == [[0.0, 17.0, 4095.0]]
+
+    def test_constant_image(self):
+        """Test that a constant image does not divide by zero."""
+        img = np.full((2, 2), 7, dtype=np.uint16)
+        
+        result = convert_bit_depth(img, 8)
+        
+        assert result.dtype == np.uint8
+        assert not result.any()
+
+    def test_downcast_stack_uses_global_range(self):
+        """Test that each plane of a stack is scaled with the full stack range."""
+        img = np.array([[[0, 100]], [[200, 300]], [[350, 510]]], dtype=np.uint16)
+        
+        result = convert_bit_depth(img.swapaxes(0, 1), 8)
         
-        # Test that we can modify the attributes (dataclass is not frozen by default)
-        params.bit_depth = 32
-        assert params.bit_depth == 32
+        assert result.shape == (1, 3, 2)
+        assert result.tolist() == [[[0, 50], [100, 150], [175, 255]]]
\ No newline at end of file
@@ -2,14 +2,38 @@
 import pytest
 from unittest.mock import patch, MagicMock
 
+from czi2tif import logging as logging_module
+from czi2tif.logging import setup_logging
+
 
 def test_logging_module_imports():
     """Test that the logging module can be imported."""
-    try:
-        from czi2tif import logging
-        assert logging is not None
-    except ImportError:
-        pytest.skip("Logging module not found")
+    assert logging_module is not None
+
+
+@pytest.mark.parametrize("level, has_location", [("DEBUG", True), ("INFO", False)])
+def test_setup_logging_format(level, has_location):
+    """Test that the caller location is only logged at DEBUG level."""
+    logger = setup_logging(log_level=level)
+    log_format = logger.handlers[0].formatter._fmt
+
+    assert ("%(funcName)s" in log_format) is has_location
+    assert ("%(lineno)d" in log_format) is has_location
+    # The stack is only walked for the caller when its location is logged
+    assert (logging_module.logging._srcfile is not None) is has_location
+
+
+def test_setup_logging_file_output(tmp_path):
+    """Test that queued file records are written and handlers are not duplicated."""
+    log_file = tmp_path / "logs" / "czi2tif.log"
+    logger = setup_logging(log_file=log_file, console_output=False, file_output=True)
+    logger.warning("converted %s", "test.czi")
+
+    # Reconfiguring flushes the queued records and replaces the handlers
+    logger = setup_logging(console_output=False)
+
+    assert logger.handlers == []
+    assert "WARNING - converted test.czi" in log_file.read_text()
 
 
 # Add more specific tests for your logging functionality
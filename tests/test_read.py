@@ -3,9 +3,13 @@
 import pytest
 from unittest.mock import patch, Mock
 from pathlib import Path
+import os
+import threading
 import numpy as np
 import xml.etree.ElementTree as ET
+from tifffile import COMPRESSION, PHOTOMETRIC, TiffFile, imwrite
 
+from czi2tif import read as read_module
 from czi2tif.read import (
     read_czi,
     get_resolution,
@@ -18,8 +22,67 @@ from czi2tif.read import (
     process_czi,
     process_lif,
     process_file,
+    FILE_HANDLERS,
+    write_tif,
+    is_up_to_date,
 )
 from czi2tif.export import ExportParams
+from czi2tif.formats import SUPPORTED_EXTENSIONS
+from tests.helpers import BBox, CZI_SPEC
+
+# Parsed metadata for the resolution tests, in meters per pixel
+XYZ_METADATA = ET.fromstring(
+    '<root><Distance Id="X"><Value>1.0e-6</Value></Distance>'
+    '<Distance Id="Y"><Value>1.0e-6</Value></Distance>'
+    '<Distance Id="Z"><Value>2.0e-6</Value></Distance></root>'
+)
+XY_METADATA = ET.fromstring(
+    '<root><Distance Id="X"><Value>1.0e-6</Value></Distance>'
+    '<Distance Id="Y"><Value>1.0e-6</Value></Distance></root>'
+)
+# CZI-like nested Scaling block after other metadata
+NESTED_METADATA = ET.fromstring("""
+    <ImageDocument>
+        <Metadata>
+            <Information><Image><SizeX>100</SizeX></Image></Information>
+            <Scaling>
+                <Items>
+                    <Distance Id="X"><Value>5.0e-7</Value></Distance>
+                    <Distance Id="Y"><Value>5.0e-7</Value></Distance>
+                    <Distance Id="Z"><Value>2.0e-6</Value></Distance>
+                </Items>
+            </Scaling>
+        </Metadata>
+    </ImageDocument>
+    """)
+# A non-numeric Z size falls back to a 2D resolution
+INVALID_Z_METADATA = ET.fromstring(
+    '<root><Distance Id="X"><Value>1.0e-6</Value></Distance>'
+    '<Distance Id="Y"><Value>2.0e-6</Value></Distance>'
+    '<Distance Id="Z"><Value>n/a</Value></Distance></root>'
+)
+EMPTY_METADATA = ET.fromstring("<root></root>")
+
+
+def make_mosaic_czi(plane=None, bbox=BBox(0, 0, 100, 100)):
+    """Build a mock CZI file with one mosaic scene whose reads return plane."""
+    mock_czi = Mock(spec=CZI_SPEC)
+    mock_czi.get_all_mosaic_scene_bounding_boxes.return_value = [bbox]
+    mock_czi.read_mosaic.return_value = (
+        np.array([[[1, 2, 3]]]) if plane is None else plane
+    )
+    return mock_czi
+
+
+# ExportParams is frozen, so one instance is shared by the tests that never
+# write (their file handlers are mocked)
+EXPORT_PARAMS = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
+
+
+@pytest.fixture
+def export_params(tmp_path):
+    """Export parameters for tests that write, even through a mocked imwrite."""
+    return ExportParams(output_dir=tmp_path, bit_depth=16)
 
 
 class TestReadModule:
@@ -27,9 +90,7 @@ class TestReadModule:
 
     def test_read_module_imports(self):
         """Test that the read module can be imported."""
-        from czi2tif import read
-
-        assert read is not None
+        assert read_module is not None
 
     @patch("czi2tif.read.CziFile")
     def test_read_czi_success(self, mock_czi_file):
@@ -45,63 +106,56 @@ class TestReadModule:
     @patch("czi2tif.read.CziFile")
     def test_read_czi_failure(self, mock_czi_file):
         """Test CZI file reading failure."""
-        mock_czi_file.side_effect = Exception("File not found")
+        mock_czi_file.side_effect = FileNotFoundError("File not found")
 
-        with pytest.raises(Exception):
+        with pytest.raises(FileNotFoundError, match="File not found"):
             read_czi("nonexistent.czi")
 
-    def test_get_resolution_with_xyz(self):
-        """Test resolution extraction with X, Y, Z coordinates."""
-        xml_content = """
-        <root>
-            <Distance Id="X">
-                <Value>1.0e-6</Value>
-            </Distance>
-            <Distance Id="Y">
-                <Value>1.0e-6</Value>
-            </Distance>
-            <Distance Id="Z">
-                <Value>2.0e-6</Value>
-            </Distance>
-        </root>
-        """
-        metadata = ET.fromstring(xml_content)
-
-        resolution = get_resolution(metadata)
-
-        assert len(resolution) == 3
-        assert resolution[0] == 1.0  # 1 / (1.0e-6 * 1e6) = 1.0
-        assert resolution[1] == 1.0
-        assert resolution[2] == 0.5  # 1 / (2.0e-6 * 1e6) = 0.5
-
-    def test_get_resolution_with_xy_only(self):
-        """Test resolution extraction with X, Y coordinates only."""
+    @pytest.mark.parametrize(
+        "metadata, expected",
+        [
+            (XYZ_METADATA, (1.0, 1.0, 0.5)),  # 1 / (2.0e-6 * 1e6) = 0.5 for Z
+            (XY_METADATA, (1.0, 1.0)),
+            (NESTED_METADATA, (2.0, 2.0, 0.5)),
+            (INVALID_Z_METADATA, (1.0, 0.5)),
+            (EMPTY_METADATA, (1, 1, 1)),
+        ],
+        ids=["xyz", "xy-only", "nested-scaling", "invalid-z", "no-metadata"],
+    )
+    def test_get_resolution(self, metadata, expected):
+        """Test resolution extraction in pixels per micron from parsed metadata."""
+        assert get_resolution(metadata) == expected
+
+    def test_get_resolution_from_raw_xml(self):
+        """Test resolution extraction streams raw XML and stops once X/Y/Z are found."""
         xml_content = """
-        <root>
-            <Distance Id="X">
-                <Value>1.0e-6</Value>
-            </Distance>
-            <Distance Id="Y">
-                <Value>1.0e-6</Value>
-            </Distance>
-        </root>
-        """
-        metadata = ET.fromstring(xml_content)
-
-        resolution = get_resolution(metadata)
-
-        assert len(resolution) == 2
-        assert resolution[0] == 1.0
-        assert resolution[1] == 1.0
-
-    def test_get_resolution_no_metadata(self):
-        """Test resolution extraction when no metadata is present."""
-        xml_content = "<root></root>"
-        metadata = ET.fromstring(xml_content)
-
-        resolution = get_resolution(metadata)
+        <ImageDocument>
+            <Scaling>
+                <Distance Id="X"><Value>1.0e-6</Value></Distance>
+                <Distance Id="Y"><Value>1.0e-6</Value></Distance>
+                <Distance Id="Z"><Value>2.0e-6</Value></Distance>
+            </Scaling>
+        """  # truncated on purpose: the parser must not reach the end
+
+        assert get_resolution(xml_content) == (1.0, 1.0, 0.5)
+        assert get_resolution(xml_content.encode()) == (1.0, 1.0, 0.5)
+
+    @pytest.mark.parametrize(
+        "before",
+        ["", "<Information><Scaling><Unit>um</Unit></Scaling></Information>"],
+        ids=["scaling-first", "after-unrelated-scaling"],
+    )
+    def test_get_resolution_from_raw_xml_stops_after_scaling(self, before):
+        """Test that raw XML is not parsed past the Scaling block with Distances."""
+        # truncated after Scaling: reaching the end would raise a ParseError
+        xml_content = (
+            f"<ImageDocument>{before}<Scaling>"
+            '<Distance Id="X"><Value>1.0e-6</Value></Distance>'
+            '<Distance Id="Y"><Value>2.0e-6</Value></Distance>'
+            "</Scaling><DisplaySetting>"
+        )
 
-        assert resolution == (1, 1, 1)
+        assert get_resolution(xml_content) == (1.0, 0.5)
 
     def test_has_scenes(self):
         """Test scene detection in CZI dimensions."""
@@ -122,190 +176,334 @@ class TestReadModule:
         assert has_stacks("TCYX") is False
         assert has_stacks("MCYX") is False
 
-    def test_get_scene_data(self):
+    @pytest.mark.parametrize(
+        "cores, read_kwargs", [(None, {"S": 0}), (2, {"S": 0, "cores": 2})]
+    )
+    def test_get_scene_data(self, cores, read_kwargs):
         """Test scene data extraction."""
-        mock_czi = Mock()
+        mock_czi = Mock(spec=CZI_SPEC)
         mock_data = np.array([[[1, 2, 3]]])
         mock_dims = ["T", "C", "Y", "X"]
         mock_czi.read_image.return_value = (mock_data, mock_dims)
 
-        data, dims = get_scene_data(mock_czi, 0)
+        data, dims = get_scene_data(mock_czi, 0, cores)
 
-        mock_czi.read_image.assert_called_once_with(S=0)
-        assert np.array_equal(data, mock_data)
+        mock_czi.read_image.assert_called_once_with(**read_kwargs)
+        assert data is mock_data
         assert dims == mock_dims
 
     def test_get_stack_data(self):
         """Test stack data extraction."""
-        mock_czi = Mock()
+        mock_czi = Mock(spec=CZI_SPEC)
         mock_czi.get_dims_shape.return_value = [{"Z": (0, 2), "C": (0, 2)}]
         mock_czi.read_image.return_value = (
-            np.array([[[1, 2, 3]]]),
+            np.array([[[[1, 2, 3]], [[4, 5, 6]]]]),
             ["T", "C", "Y", "X"],
         )
 
         data, dims = get_stack_data(mock_czi, 0)
 
-        assert mock_czi.read_image.call_count == 4  # 2 Z planes * 2 channels
-        assert data.shape == (2, 2, 1, 1, 3)  # Z, C, T, C, Y, X
+        assert mock_czi.read_image.call_count == 2  # 2 Z planes, all channels
+        # The reader threads run libCZI single-threaded
+        assert {c.kwargs["cores"] for c in mock_czi.read_image.call_args_list} == {1}
+        assert data.shape == (2, 2, 1, 1, 1, 3)  # Z, C, T, C, Y, X
+        assert data[0, :, 0, 0, 0].tolist() == [[1, 2, 3], [4, 5, 6]]
+        assert data.dtype == mock_czi.read_image.return_value[0].dtype
+        assert len(dims) == 2 and len(dims[0]) == 2
+
+    def test_get_stack_data_plane_order(self):
+        """Test that planes read on the reader threads land at their (Z, C) slot."""
+        mock_czi = Mock(spec=CZI_SPEC)
+        mock_czi.get_dims_shape.return_value = [{"Z": (0, 3), "C": (0, 2)}]
+        mock_czi.read_image.side_effect = lambda S, Z, cores: (
+            np.stack([np.full((1, 2), 10 * Z + c, dtype=np.uint16) for c in (0, 1)]),
+            [("C", 2), ("Y", 1), ("X", Z)],
+        )
+
+        data, dims = get_stack_data(mock_czi, 0)
+
+        assert data[:, :, 0, 0, 0].tolist() == [[0, 1], [10, 11], [20, 21]]
+        assert dims[2][1] == [("C", 2), ("Y", 1), ("X", 2)]
 
-    def test_get_mosaic_data_no_stacks(self):
-        """Test mosaic data extraction without stacks."""
-        # Mock bounding box
-        mock_bbox = Mock()
-        mock_bbox.x = 0
-        mock_bbox.y = 0
-        mock_bbox.w = 100
-        mock_bbox.h = 100
+    def test_get_stack_data_read_error(self):
+        """Test that a failing plane read is raised to the caller."""
+        mock_czi = Mock(spec=CZI_SPEC)
+        mock_czi.get_dims_shape.return_value = [{"Z": (0, 2), "C": (0, 1)}]
+        mock_czi.read_image.side_effect = [
+            (np.zeros((1, 1, 2)), [("C", 1), ("Y", 1), ("X", 2)]),
+            RuntimeError("corrupt subblock"),
+        ]
 
-        mock_czi = Mock()
-        mock_czi.get_all_mosaic_scene_bounding_boxes.return_value = [mock_bbox]
-        mock_czi.read_mosaic.return_value = np.array([[[1, 2, 3]]])
+        with pytest.raises(RuntimeError, match="corrupt subblock"):
+            get_stack_data(mock_czi, 0)
 
-        czi_shape = [{"C": (0, 2)}]  # 2 channels
-        czi_dims = "MCYX"  # Mosaic, no Z stacks
+    @pytest.mark.parametrize(
+        "czi_dims, entry_shape, reads, shape",
+        [
+            ("MCYX", {"C": (0, 2)}, 2, (1, 2, 3)),  # 2 channels
+            ("MCZYX", {"C": (0, 2), "Z": (0, 3)}, 6, (3, 2, 3)),  # 2 channels * 3 Z
+        ],
+        ids=["no-stacks", "stacks"],
+    )
+    def test_get_mosaic_data(self, czi_dims, entry_shape, reads, shape):
+        """Test mosaic data extraction, one read per channel and Z plane."""
+        mock_czi = make_mosaic_czi()
 
-        data = get_mosaic_data(mock_czi, 0, czi_dims, czi_shape)
+        data = get_mosaic_data(mock_czi, 0, czi_dims, [entry_shape])
 
         mock_czi.get_all_mosaic_scene_bounding_boxes.assert_called_once()
-        # Should be called twice for 2 channels
-        assert mock_czi.read_mosaic.call_count == 2
-        assert data.shape == (1, 2, 3)  # After axis swap: (planes, channels, data_dims)
+        assert mock_czi.read_mosaic.call_count == reads
+        assert data.shape == shape  # (planes, channels, data_dims)
+
+    def test_get_mosaic_data_reads_channels_in_parallel(self, monkeypatch):
+        """Test that mosaic channels are read concurrently, one plane each."""
+        monkeypatch.setattr("czi2tif.read.READ_WORKERS", 4)
+        barrier = threading.Barrier(2, timeout=5)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def read_mosaic(region, scale_factor, C, Z):
+            with lock:
+                active.append(C)
+                peak.append(len(active))
+            # Fails with BrokenBarrierError unless both channels are in flight
+            barrier.wait()
+            with lock:
+                active.remove(C)
+            return np.zeros((1, 2, 2), dtype=np.uint16)
+
+        mock_czi = make_mosaic_czi(bbox=BBox(0, 0, 2, 2))
+        mock_czi.read_mosaic.side_effect = read_mosaic
+
+        data = get_mosaic_data(mock_czi, 0, "MCZYX", [{"C": (0, 2), "Z": (0, 3)}])
+
+        assert data.shape == (3, 2, 2, 2)
+        assert max(peak) == 2
+
+    def test_get_mosaic_data_pins_single_time_point(self):
+        """Test that a single time point is passed explicitly to read_mosaic."""
+        mock_czi = make_mosaic_czi(
+            np.zeros((1, 2, 2), dtype=np.uint16), BBox(0, 0, 2, 2)
+        )
 
-    def test_get_mosaic_data_with_stacks(self):
-        """Test mosaic data extraction with stacks."""
-        # Mock bounding box
-        mock_bbox = Mock()
-        mock_bbox.x = 0
-        mock_bbox.y = 0
-        mock_bbox.w = 100
-        mock_bbox.h = 100
+        get_mosaic_data(mock_czi, 0, "TMCYX", [{"T": (0, 1), "C": (0, 1)}])
 
-        mock_czi = Mock()
-        mock_czi.get_all_mosaic_scene_bounding_boxes.return_value = [mock_bbox]
-        mock_czi.read_mosaic.return_value = np.array([[[1, 2, 3]]])
+        mock_czi.read_mosaic.assert_called_once_with(
+            region=(0, 0, 2, 2), scale_factor=1, C=0, T=0
+        )
 
-        czi_shape = [{"C": (0, 2), "Z": (0, 3)}]  # 2 channels, 3 Z planes
-        czi_dims = "MCZYX"  # Mosaic with Z stacks
+    def test_get_mosaic_data_axis_order(self):
+        """Test that mosaic tiles are stored at their (Z, C) position."""
+        mock_czi = make_mosaic_czi(bbox=BBox(0, 0, 2, 1))
+        mock_czi.read_mosaic.side_effect = lambda region, scale_factor, C, Z: (
+            np.full((1, 1, 2), 10 * Z + C, dtype=np.uint16)
+        )
 
-        data = get_mosaic_data(mock_czi, 0, czi_dims, czi_shape)
+        data = get_mosaic_data(mock_czi, 0, "MCZYX", [{"C": (0, 2), "Z": (0, 3)}])
 
-        mock_czi.get_all_mosaic_scene_bounding_boxes.assert_called_once()
-        # Should be called 6 times (2 channels * 3 Z planes)
-        assert mock_czi.read_mosaic.call_count == 6
-        assert data.shape == (
-            2,
-            3,
-            3,
-        )  # No axis swap with stacks: (channels, planes, data_dims)
+        assert data.dtype == np.uint16
+        assert data[:, :, 0].tolist() == [[0, 1], [10, 11], [20, 21]]
+
+    @patch("czi2tif.read.imwrite")
+    def test_write_tif_compression(self, mock_imwrite, tmp_path):
+        """Test that compression and the predictor are forwarded to imwrite."""
+        img = np.zeros((2, 4, 4), dtype=np.uint16)
+        export_params = ExportParams(
+            output_dir=tmp_path, bit_depth=16, compression="zlib"
+        )
+
+        write_tif(tmp_path / "out.tif", img, (2.0, 2.0, 0.5), export_params)
+
+        kwargs = mock_imwrite.call_args.kwargs
+        assert kwargs["imagej"] is True
+        assert kwargs["resolution"] == (2.0, 2.0)
+        assert kwargs["compression"] == "zlib"
+        assert kwargs["predictor"] is True
+
+    @patch("czi2tif.read.imwrite")
+    def test_write_tif_uncompressed(self, mock_imwrite, export_params):
+        """Test that output is uncompressed by default."""
+        img = np.zeros((2, 4, 4), dtype=np.uint16)
+
+        write_tif(export_params.output_dir / "out.tif", img, (1.0, 1.0), export_params)
+
+        kwargs = mock_imwrite.call_args.kwargs
+        assert kwargs["compression"] is None
+        assert kwargs["predictor"] is False
+
+    @patch("czi2tif.read.imwrite")
+    def test_write_tif_unique_partial_file(self, mock_imwrite, export_params):
+        """Test that concurrent writes to one output use separate partial files."""
+        output_path = export_params.output_dir / "out.tif"
+        img = np.zeros((4, 4), dtype=np.uint16)
+
+        write_tif(output_path, img, (1.0, 1.0), export_params)
+        write_tif(output_path, img, (1.0, 1.0), export_params)
+
+        first, second = (call.args[0].name for call in mock_imwrite.call_args_list)
+        assert first != second
+        assert Path(first).name.startswith(".out.tif.")
+        assert [path.name for path in export_params.output_dir.iterdir()] == ["out.tif"]
+
+    def test_write_tif_interrupted(self, export_params):
+        """Test that a failed write leaves neither a truncated nor a partial TIF."""
+        output_path = export_params.output_dir / "out.tif"
+
+        def planes():
+            yield np.zeros((4, 4), dtype=np.uint16)
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            write_tif(
+                output_path, planes(), (1.0, 1.0), export_params, (2, 4, 4), np.uint16
+            )
+
+        assert list(export_params.output_dir.iterdir()) == []
+
+    @pytest.mark.parametrize("compression", [None, "zlib"])
+    @pytest.mark.parametrize(
+        "img",
+        [
+            np.swapaxes(
+                np.arange(2 * 3 * 4 * 4, dtype=np.uint16).reshape(2, 3, 4, 4), 0, 1
+            ),
+            np.arange(4 * 5, dtype=np.uint16).reshape(4, 5).T,
+            np.swapaxes(
+                np.arange(2 * 3 * 4 * 5 * 3, dtype=np.uint8).reshape(2, 3, 4, 5, 3),
+                0,
+                1,
+            ),
+        ],
+        ids=["stack", "2d", "rgb"],
+    )
+    def test_write_tif_swapped_axes(self, tmp_path, img, compression):
+        """Test that a non-contiguous view is written page by page unchanged."""
+        export_params = ExportParams(
+            output_dir=tmp_path, bit_depth=16, compression=compression
+        )
+        output_path = tmp_path / "swapped.tif"
+
+        write_tif(output_path, img, (1.0, 1.0), export_params)
+
+        with TiffFile(output_path) as tif:
+            assert tif.is_imagej
+            assert np.array_equal(tif.asarray(), img)
 
     @patch("czi2tif.read.read_czi")
     @patch("czi2tif.read.get_resolution")
     @patch("czi2tif.read.imwrite")
     def test_process_czi_single_scene(
-        self, mock_imwrite, mock_get_resolution, mock_read_czi
+        self, mock_imwrite, mock_get_resolution, mock_read_czi, export_params
     ):
         """Test processing a single scene CZI file."""
-        mock_czi = Mock()
+        mock_czi = Mock(spec=CZI_SPEC)
         mock_czi.dims = "TCYX"  # No Z dimension to avoid stack processing
         mock_czi.get_dims_shape.return_value = [{"S": (0, 1)}]
         mock_czi.read_image.return_value = (
             np.array([[[[1, 2, 3]]]]),
             ["T", "C", "Y", "X"],
         )
-        mock_czi.meta = Mock()
 
         mock_read_czi.return_value = mock_czi
         mock_get_resolution.return_value = (1.0, 1.0, 1.0)
 
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
-
         process_czi(Path("test.czi"), export_params)
 
         mock_read_czi.assert_called_once()
         mock_get_resolution.assert_called_once()
         mock_imwrite.assert_called_once()
 
+    @patch("czi2tif.read.read_czi")
+    @patch("czi2tif.read.get_resolution")
+    def test_process_czi_streams_swapped_scene(
+        self, mock_get_resolution, mock_read_czi, tmp_path
+    ):
+        """Test that a scene with swapped axes is streamed, not copied whole."""
+        scene = np.arange(2 * 3 * 4 * 5, dtype=np.uint16).reshape(2, 3, 4, 5)
+        mock_czi = Mock(spec=CZI_SPEC)
+        mock_czi.dims = "CTYX"
+        mock_czi.get_dims_shape.return_value = [{"C": (0, 2), "T": (0, 3)}]
+        mock_czi.read_image.return_value = (scene, ["C", "T", "Y", "X"])
+        mock_read_czi.return_value = mock_czi
+        mock_get_resolution.return_value = (1.0, 1.0)
+
+        export_params = ExportParams(output_dir=tmp_path)
+        with patch("czi2tif.read.imwrite", wraps=imwrite) as mock_imwrite:
+            process_czi(Path("test.czi"), export_params)
+
+        assert not isinstance(mock_imwrite.call_args.args[1], np.ndarray)
+        with TiffFile(tmp_path / "test_0.tif") as tif:
+            assert np.array_equal(tif.asarray(), np.swapaxes(scene, 0, 1))
+
+    @pytest.mark.parametrize(
+        "czi_dims, entry_shape, reads",
+        [
+            ("MCYX", {"S": (0, 1), "M": (0, 1), "C": (0, 2)}, 2),
+            ("MCZYX", {"S": (0, 1), "M": (0, 1), "C": (0, 2), "Z": (0, 3)}, 6),
+        ],
+        ids=["no-stacks", "stacks"],
+    )
     @patch("czi2tif.read.read_czi")
     @patch("czi2tif.read.get_resolution")
     @patch("czi2tif.read.imwrite")
-    def test_process_czi_with_mosaics_no_stacks(
-        self, mock_imwrite, mock_get_resolution, mock_read_czi
+    def test_process_czi_with_mosaics(
+        self,
+        mock_imwrite,
+        mock_get_resolution,
+        mock_read_czi,
+        czi_dims,
+        entry_shape,
+        reads,
+        export_params,
     ):
-        """Test processing a CZI file with mosaics but no stacks."""
-        # Mock bounding box object
-        mock_bbox = Mock()
-        mock_bbox.x = 0
-        mock_bbox.y = 0
-        mock_bbox.w = 100
-        mock_bbox.h = 100
-
-        mock_czi = Mock()
-        mock_czi.dims = "MCYX"  # M for mosaic, no Z for stacks
-        mock_czi.get_dims_shape.return_value = [{"S": (0, 1), "M": (0, 1), "C": (0, 2)}]
-        mock_czi.get_all_mosaic_scene_bounding_boxes.return_value = [mock_bbox]
-        mock_czi.read_mosaic.return_value = np.array([[[1, 2, 3]]])
-        mock_czi.meta = Mock()
-
+        """Test processing a CZI file with mosaics, with and without stacks."""
+        mock_czi = make_mosaic_czi()
+        mock_czi.dims = czi_dims
+        mock_czi.get_dims_shape.return_value = [entry_shape]
         mock_read_czi.return_value = mock_czi
         mock_get_resolution.return_value = (1.0, 1.0, 1.0)
 
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
-
         process_czi(Path("test.czi"), export_params)
 
         mock_read_czi.assert_called_once()
         mock_get_resolution.assert_called_once()
         mock_czi.get_all_mosaic_scene_bounding_boxes.assert_called_once()
-        # Should be called 2 times for 2 channels
-        assert mock_czi.read_mosaic.call_count == 2
+        assert mock_czi.read_mosaic.call_count == reads
         mock_imwrite.assert_called_once()
 
+    @pytest.mark.parametrize("bit_depth", [None, 8, 16])
     @patch("czi2tif.read.read_czi")
     @patch("czi2tif.read.get_resolution")
-    @patch("czi2tif.read.imwrite")
-    def test_process_czi_with_mosaics_and_stacks(
-        self, mock_imwrite, mock_get_resolution, mock_read_czi
+    def test_process_czi_rgb_mosaic(
+        self, mock_get_resolution, mock_read_czi, tmp_path, bit_depth
     ):
-        """Test processing a CZI file with both mosaics and stacks."""
-        # Mock bounding box object
-        mock_bbox = Mock()
-        mock_bbox.x = 0
-        mock_bbox.y = 0
-        mock_bbox.w = 100
-        mock_bbox.h = 100
-
-        mock_czi = Mock()
-        mock_czi.dims = "MCZYX"  # M for mosaic, Z for stacks
+        """Test that RGB (BGR24) data is written as RGB in its source dtype."""
+        plane = np.arange(4 * 5 * 3, dtype=np.uint8).reshape(1, 4, 5, 3)
+        mock_czi = make_mosaic_czi(plane)
+        mock_czi.dims = "MCYXA"
         mock_czi.get_dims_shape.return_value = [
-            {"S": (0, 1), "M": (0, 1), "C": (0, 2), "Z": (0, 3)}
+            {"S": (0, 1), "M": (0, 1), "C": (0, 1), "A": (0, 3)}
         ]
-        mock_czi.get_all_mosaic_scene_bounding_boxes.return_value = [mock_bbox]
-        mock_czi.read_mosaic.return_value = np.array([[[1, 2, 3]]])
-        mock_czi.meta = Mock()
-
         mock_read_czi.return_value = mock_czi
-        mock_get_resolution.return_value = (1.0, 1.0, 1.0)
-
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
+        mock_get_resolution.return_value = (1.0, 1.0)
+        export_params = ExportParams(output_dir=tmp_path, bit_depth=bit_depth)
 
         process_czi(Path("test.czi"), export_params)
 
-        mock_read_czi.assert_called_once()
-        mock_get_resolution.assert_called_once()
-        mock_czi.get_all_mosaic_scene_bounding_boxes.assert_called_once()
-        # Should be called 6 times (2 channels * 3 Z planes)
-        assert mock_czi.read_mosaic.call_count == 6
-        mock_imwrite.assert_called_once()
+        with TiffFile(tmp_path / "test_0.tif") as tif:
+            assert tif.series[0].axes == "YXS"
+            assert tif.pages[0].photometric == PHOTOMETRIC.RGB
+            assert np.array_equal(tif.asarray(), plane[0])
 
     @patch("czi2tif.read.read_czi")
     @patch("czi2tif.read.get_resolution")
     @patch("czi2tif.read.imwrite")
     def test_process_czi_mixed_mosaic_and_non_mosaic(
-        self, mock_imwrite, mock_get_resolution, mock_read_czi
+        self, mock_imwrite, mock_get_resolution, mock_read_czi, export_params
     ):
         """Test processing a CZI file with some mosaic and some non-mosaic entries."""
-        mock_czi = Mock()
+        mock_czi = make_mosaic_czi()
         mock_czi.dims = "SMCYX"  # S for scenes, M for mosaic
         # First entry has no mosaic (M=0), second entry has mosaic (M=1)
         mock_czi.get_dims_shape.return_value = [
@@ -317,21 +515,9 @@ class TestReadModule:
             ["T", "C", "Y", "X"],
         )
 
-        # Mock bounding box for mosaic entry
-        mock_bbox = Mock()
-        mock_bbox.x = 0
-        mock_bbox.y = 0
-        mock_bbox.w = 100
-        mock_bbox.h = 100
-        mock_czi.get_all_mosaic_scene_bounding_boxes.return_value = [mock_bbox]
-        mock_czi.read_mosaic.return_value = np.array([[[1, 2, 3]]])
-        mock_czi.meta = Mock()
-
         mock_read_czi.return_value = mock_czi
         mock_get_resolution.return_value = (1.0, 1.0, 1.0)
 
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
-
         process_czi(Path("test.czi"), export_params)
 
         mock_read_czi.assert_called_once()
@@ -345,7 +531,7 @@ class TestReadModule:
 
     @patch("czi2tif.read.LifFile")
     @patch("czi2tif.read.imwrite")
-    def test_process_lif(self, mock_imwrite, mock_lif_file):
+    def test_process_lif(self, mock_imwrite, mock_lif_file, export_params):
         """Test processing a LIF file."""
         mock_image = Mock()
         mock_image.name = "test_image"
@@ -356,8 +542,6 @@ class TestReadModule:
         mock_lif_obj.get_iter_image.return_value = [mock_image]
         mock_lif_file.return_value = mock_lif_obj
 
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
-
         process_lif(Path("test.lif"), export_params)
 
         mock_lif_file.assert_called_once_with(Path("test.lif"))
@@ -365,7 +549,42 @@ class TestReadModule:
 
     @patch("czi2tif.read.LifFile")
     @patch("czi2tif.read.imwrite")
-    def test_process_lif_no_resolution(self, mock_imwrite, mock_lif_file):
+    def test_process_lif_bit_depth(self, mock_imwrite, mock_lif_file, tmp_path):
+        """Test that LIF frames are converted to the requested bit depth."""
+        mock_image = Mock()
+        mock_image.name = "test_image"
+        mock_image.scale = (1.0, 1.0, 1.0)
+        mock_image.get_frame.return_value = np.array([[0, 1000, 4000]], dtype=np.uint16)
+        mock_lif_file.return_value.get_iter_image.return_value = [mock_image]
+
+        export_params = ExportParams(output_dir=tmp_path, bit_depth=8)
+
+        process_lif(Path("test.lif"), export_params)
+
+        written = mock_imwrite.call_args.args[1]
+        assert written.dtype == np.uint8
+        assert written.tolist() == [[0, 64, 255]]
+
+    @patch("czi2tif.read.LifFile")
+    @patch("czi2tif.read.imwrite")
+    def test_process_lif_frame_not_copied(self, mock_imwrite, mock_lif_file, tmp_path):
+        """Test that a frame already at the output bit depth is written as is."""
+        frame = np.array([[0, 1000, 4000]], dtype=np.uint16)
+        mock_image = Mock()
+        mock_image.name = "test_image"
+        mock_image.scale = (1.0, 1.0, 1.0)
+        mock_image.get_frame.return_value = frame
+        mock_lif_file.return_value.get_iter_image.return_value = [mock_image]
+
+        process_lif(Path("test.lif"), ExportParams(output_dir=tmp_path, bit_depth=16))
+
+        assert mock_imwrite.call_args.args[1] is frame
+
+    @patch("czi2tif.read.LifFile")
+    @patch("czi2tif.read.imwrite")
+    def test_process_lif_no_resolution(
+        self, mock_imwrite, mock_lif_file, export_params
+    ):
         """Test processing a LIF file without resolution metadata."""
         mock_image = Mock()
         mock_image.name = "test_image"
@@ -376,34 +595,202 @@ class TestReadModule:
         mock_lif_obj.get_iter_image.return_value = [mock_image]
         mock_lif_file.return_value = mock_lif_obj
 
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
-
         process_lif(Path("test.lif"), export_params)
 
         mock_lif_file.assert_called_once_with(Path("test.lif"))
         mock_imwrite.assert_called_once()
 
-    @patch("czi2tif.read.process_czi")
-    def test_process_file_czi(self, mock_process_czi):
+    def test_is_up_to_date(self, tmp_path):
+        """Test the output-newer-than-source check."""
+        source = tmp_path / "test.czi"
+        output = tmp_path / "test_0.tif"
+        source.touch()
+
+        assert is_up_to_date(output, source) is False
+
+        output.touch()
+        os.utime(source, (1000, 1000))
+        os.utime(output, (2000, 2000))
+        assert is_up_to_date(output, source) is True
+
+        os.utime(source, (3000, 3000))
+        assert is_up_to_date(output, source) is False
+
+    @patch("czi2tif.read.read_czi")
+    @patch("czi2tif.read.get_resolution")
+    def test_process_czi_streams_stack_planes(
+        self, mock_get_resolution, mock_read_czi, tmp_path
+    ):
+        """Test that stack planes streamed to disk end up in (Z, C) order."""
+        mock_czi = Mock(spec=CZI_SPEC)
+        mock_czi.dims = "SCZYX"
+        mock_czi.get_dims_shape.return_value = [
+            {"S": (0, 1), "C": (0, 2), "Z": (0, 3), "Y": (0, 4), "X": (0, 5)}
+        ]
+        mock_czi.read_image.side_effect = lambda S, Z, cores: (
+            np.stack([np.full((1, 4, 5), 10 * Z + c, dtype=np.uint16) for c in (0, 1)]),
+            [("C", 2), ("Z", 1), ("Y", 4), ("X", 5)],
+        )
+        mock_read_czi.return_value = mock_czi
+        mock_get_resolution.return_value = (1.0, 1.0, 1.0)
+
+        export_params = ExportParams(output_dir=tmp_path, bit_depth=16)
+        process_czi(Path("test.czi"), export_params)
+
+        with TiffFile(tmp_path / "test_0.tif") as tif:
+            data = tif.asarray()
+        assert data.shape == (3, 2, 4, 5)
+        assert data.dtype == np.uint16
+        assert data[:, :, 0, 0].tolist() == [[0, 1], [10, 11], [20, 21]]
+
+    @patch("czi2tif.read.read_czi")
+    @patch("czi2tif.read.get_resolution")
+    def test_process_czi_compresses_multi_time_point_stack(
+        self, mock_get_resolution, mock_read_czi, tmp_path
+    ):
+        """Test that stack planes holding several time points are compressed."""
+        mock_czi = Mock(spec=CZI_SPEC)
+        mock_czi.dims = "SCTZYX"
+        mock_czi.get_dims_shape.return_value = [
+            {"S": (0, 1), "C": (0, 2), "T": (0, 2), "Z": (0, 3)}
+        ]
+        mock_czi.read_image.side_effect = lambda S, Z, cores: (
+            np.stack(
+                [
+                    np.full((2, 1, 4, 5), 10 * Z + c, dtype=np.uint16)
+                    + np.arange(2, dtype=np.uint16).reshape(2, 1, 1, 1) * 100
+                    for c in (0, 1)
+                ]
+            ),
+            [("C", 2), ("T", 2), ("Z", 1), ("Y", 4), ("X", 5)],
+        )
+        mock_read_czi.return_value = mock_czi
+        mock_get_resolution.return_value = (1.0, 1.0, 1.0)
+
+        export_params = ExportParams(output_dir=tmp_path, compression="zlib")
+        process_czi(Path("test.czi"), export_params)
+
+        with TiffFile(tmp_path / "test_0.tif") as tif:
+            data = tif.asarray()
+            assert tif.pages[0].compression == COMPRESSION.ADOBE_DEFLATE
+        assert data.shape == (3, 2, 2, 4, 5)
+        assert data[:, :, :, 0, 0].tolist() == [
+            [[0, 100], [1, 101]],
+            [[10, 110], [11, 111]],
+            [[20, 120], [21, 121]],
+        ]
+
+    @pytest.mark.parametrize("max_assembled_bytes, reads", [(2**30, 3), (0, 6)])
+    @patch("czi2tif.read.read_czi")
+    @patch("czi2tif.read.get_resolution")
+    def test_process_czi_stretches_large_stacks_in_two_passes(
+        self,
+        mock_get_resolution,
+        mock_read_czi,
+        max_assembled_bytes,
+        reads,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that stacks too large to assemble are stretched in two passes."""
+        monkeypatch.setattr("czi2tif.read.MAX_ASSEMBLED_BYTES", max_assembled_bytes)
+        mock_czi = Mock(spec=CZI_SPEC)
+        mock_czi.dims = "SCZYX"
+        mock_czi.get_dims_shape.return_value = [{"S": (0, 1), "C": (0, 2), "Z": (0, 3)}]
+        mock_czi.read_image.side_effect = lambda S, Z, cores: (
+            np.stack(
+                [np.full((4, 5), 1000 * Z + 500 * c, dtype=np.uint16) for c in (0, 1)]
+            ),
+            [("C", 2), ("Y", 4), ("X", 5)],
+        )
+        mock_read_czi.return_value = mock_czi
+        mock_get_resolution.return_value = (1.0, 1.0, 1.0)
+
+        export_params = ExportParams(output_dir=tmp_path, bit_depth=8)
+        process_czi(Path("test.czi"), export_params)
+
+        with TiffFile(tmp_path / "test_0.tif") as tif:
+            data = tif.asarray()
+        assert mock_czi.read_image.call_count == reads
+        assert data.dtype == np.uint8
+        assert data[:, :, 0, 0].tolist() == [[0, 51], [102, 153], [204, 255]]
+
+    @patch("czi2tif.read.LifFile")
+    @patch("czi2tif.read.imwrite")
+    def test_process_lif_creates_output_directory_once(
+        self, mock_imwrite, mock_lif_file, tmp_path
+    ):
+        """Test that the output directory is created once for all files."""
+        mock_image = Mock()
+        mock_image.name = "test_image"
+        mock_image.scale = (1.0, 1.0, 1.0)
+        mock_image.get_frame.return_value = np.array([[[1, 2, 3]]])
+        mock_lif_file.return_value.get_iter_image.return_value = [mock_image]
+        export_params = ExportParams(output_dir=tmp_path / "output")
+
+        with patch.object(
+            Path, "mkdir", autospec=True, side_effect=Path.mkdir
+        ) as mkdir:
+            process_lif(Path("first.lif"), export_params)
+            process_lif(Path("second.lif"), export_params)
+
+        mkdir.assert_called_once()
+        assert export_params.output_dir.is_dir()
+        assert mock_imwrite.call_count == 2
+
+    @patch("czi2tif.read.LifFile")
+    @patch("czi2tif.read.imwrite")
+    def test_process_lif_skips_up_to_date_output(
+        self, mock_imwrite, mock_lif_file, tmp_path
+    ):
+        """Test that up-to-date outputs are only skipped with skip_existing."""
+        mock_image = Mock()
+        mock_image.name = "test_image"
+        mock_image.scale = (1.0, 1.0, 1.0)
+        mock_image.get_frame.return_value = np.array([[[1, 2, 3]]])
+        mock_lif_file.return_value.get_iter_image.return_value = [mock_image]
+
+        source = tmp_path / "test.lif"
+        source.touch()
+        (tmp_path / "test_test_image.tif").touch()
+        os.utime(source, (1000, 1000))
+
+        process_lif(
+            source, ExportParams(output_dir=tmp_path, bit_depth=16, skip_existing=True)
+        )
+        mock_image.get_frame.assert_not_called()
+        mock_imwrite.assert_not_called()
+
+        process_lif(source, ExportParams(output_dir=tmp_path, bit_depth=16))
+        mock_imwrite.assert_called_once()
+
+    def test_process_file_czi(self):
         """Test processing a CZI file through process_file."""
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
+        export_params = EXPORT_PARAMS
+        mock_process_czi = Mock()
 
-        process_file("test.czi", export_params)
+        with patch.dict(FILE_HANDLERS, {".czi": mock_process_czi}):
+            process_file("test.czi", export_params)
 
-        mock_process_czi.assert_called_once()
+        mock_process_czi.assert_called_once_with(Path("test.czi"), export_params)
 
-    @patch("czi2tif.read.process_lif")
-    def test_process_file_lif(self, mock_process_lif):
+    def test_process_file_lif(self):
         """Test processing a LIF file through process_file."""
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
+        export_params = EXPORT_PARAMS
+        mock_process_lif = Mock()
+
+        with patch.dict(FILE_HANDLERS, {".lif": mock_process_lif}):
+            process_file("test.lif", export_params)
 
-        process_file("test.lif", export_params)
+        mock_process_lif.assert_called_once_with(Path("test.lif"), export_params)
 
-        mock_process_lif.assert_called_once()
+    def test_file_handlers_cover_supported_extensions(self):
+        """Test that every extension the CLI accepts has a converter."""
+        assert FILE_HANDLERS.keys() == SUPPORTED_EXTENSIONS
 
     def test_process_file_unsupported_format(self):
         """Test processing an unsupported file format."""
-        export_params = ExportParams(output_dir=Path("/tmp/test"), bit_depth=16)
+        export_params = EXPORT_PARAMS
 
         with pytest.raises(ValueError, match="Unsupported file format"):
             process_file("test.txt", export_params)